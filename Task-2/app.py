@@ -7,12 +7,15 @@ from pathlib import Path
 import cv2
 import numpy as np
 from fastapi import FastAPI, File, HTTPException, Request, UploadFile
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.responses import FileResponse, HTMLResponse, PlainTextResponse
 from fastapi.templating import Jinja2Templates
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
+import metrics
 from task_2_code import annotate_changes
 
 app = FastAPI(title="Visual Change Detector")
+app.add_middleware(metrics.MetricsMiddleware)
 
 BASE_DIR = Path(__file__).resolve().parent
 OUTPUT_DIR = BASE_DIR / "task_2_output"
@@ -58,17 +61,30 @@ async def process_images(
     before_image: UploadFile = File(...),
     after_image: UploadFile = File(...),
 ) -> HTMLResponse:
+    timer: metrics.StageTimer = request.state.timings
     before_b64: str | None = None
     after_b64: str | None = None
     try:
-        before_bytes = await before_image.read()
-        after_bytes = await after_image.read()
-        before = _image_from_upload(before_bytes, before_image.filename or "before image")
-        after = _image_from_upload(after_bytes, after_image.filename or "after image")
-        before_b64 = _encode_image(before)
-        after_b64 = _encode_image(after)
-        annotated = annotate_changes(before, after)
-        annotated_b64 = _encode_image(annotated)
+        with timer.stage("read"):
+            before_bytes = await before_image.read()
+            after_bytes = await after_image.read()
+        for field, payload in (("before", before_bytes), ("after", after_bytes)):
+            metrics.UPLOAD_BYTES.labels(field=field).inc(len(payload))
+            metrics.UPLOAD_SIZE.labels(field=field).observe(len(payload))
+
+        with timer.stage("decode"):
+            before = _image_from_upload(before_bytes, before_image.filename or "before image")
+            after = _image_from_upload(after_bytes, after_image.filename or "after image")
+        metrics.IMAGE_MEGAPIXELS.labels(field="before").observe(before.shape[0] * before.shape[1] / 1e6)
+        metrics.IMAGE_MEGAPIXELS.labels(field="after").observe(after.shape[0] * after.shape[1] / 1e6)
+
+        with timer.stage("encode_previews"):
+            before_b64 = _encode_image(before)
+            after_b64 = _encode_image(after)
+        with timer.stage("annotate"):
+            annotated = annotate_changes(before, after)
+        with timer.stage("encode_result"):
+            annotated_b64 = _encode_image(annotated)
     except ValueError as exc:
         context = {
             "request": request,
@@ -78,11 +94,14 @@ async def process_images(
             "before_data": before_b64,
             "after_data": after_b64,
         }
-        return templates.TemplateResponse("index.html", context, status_code=400)
+        with timer.stage("render"):
+            return templates.TemplateResponse("index.html", context, status_code=400)
 
     output_name = f"changes_{uuid.uuid4().hex}.png"
     output_path = OUTPUT_DIR / output_name
-    cv2.imwrite(str(output_path), annotated)
+    with timer.stage("write"):
+        cv2.imwrite(str(output_path), annotated)
+    metrics.OUTPUT_BYTES.inc(output_path.stat().st_size if output_path.exists() else 0)
 
     context = {
         "request": request,
@@ -92,7 +111,13 @@ async def process_images(
         "before_data": before_b64,
         "after_data": after_b64,
     }
-    return templates.TemplateResponse("index.html", context)
+    with timer.stage("render"):
+        return templates.TemplateResponse("index.html", context)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint() -> PlainTextResponse:
+    return PlainTextResponse(generate_latest(metrics.REGISTRY), media_type=CONTENT_TYPE_LATEST)
 
 
 @app.get("/download/{filename}")
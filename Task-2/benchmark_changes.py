@@ -0,0 +1,339 @@
+"""Synthetic ground-truth benchmark for the change detector.
+
+Generates before/after pairs with known inserted edits at several resolutions
+and noise levels, times every detection mode and scores the detected boxes
+against the ground truth. Results are printed (or written) as JSON so runs can
+be diffed against each other.
+
+    python benchmark_changes.py --output bench.json
+    python benchmark_changes.py --resolutions 640x480 1920x1080 --noise 0 6 --iterations 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+import cv2
+import numpy as np
+
+from task_2_code import annotate_changes, find_change_boxes
+
+Box = tuple[int, int, int, int]
+
+DEFAULT_RESOLUTIONS = ["640x480", "1280x720", "1920x1080", "3840x2160"]
+DEFAULT_NOISE_LEVELS = [0.0, 4.0, 8.0, 16.0]
+EDIT_MARGIN = 24  # keep edits further apart than the detector's dilation can bridge
+
+
+@dataclass
+class SyntheticPair:
+    before: np.ndarray
+    after: np.ndarray
+    truth: list[Box]
+    before_png: bytes
+    after_png: bytes
+
+
+def _parse_resolution(value: str) -> tuple[int, int]:
+    try:
+        width, height = (int(part) for part in value.lower().split("x", 1))
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"Resolution must look like WIDTHxHEIGHT, got {value!r}") from exc
+    if width < 64 or height < 64:
+        raise argparse.ArgumentTypeError("Resolution must be at least 64x64.")
+    return width, height
+
+
+def _overlaps(box: Box, others: list[Box], margin: int) -> bool:
+    x, y, w, h = box
+    for ox, oy, ow, oh in others:
+        if x < ox + ow + margin and ox < x + w + margin and y < oy + oh + margin and oy < y + h + margin:
+            return True
+    return False
+
+
+def _textured_background(width: int, height: int, rng: np.random.Generator) -> np.ndarray:
+    coarse = rng.integers(40, 216, size=(height // 16 + 2, width // 16 + 2, 3), dtype=np.uint8)
+    background = cv2.resize(coarse, (width, height), interpolation=cv2.INTER_CUBIC)
+    return cv2.GaussianBlur(background, (0, 0), 3)
+
+
+def _add_noise(image: np.ndarray, sigma: float, rng: np.random.Generator) -> np.ndarray:
+    if sigma <= 0:
+        return image.copy()
+    noisy = image.astype(np.float32) + rng.normal(0.0, sigma, size=image.shape).astype(np.float32)
+    return np.clip(noisy, 0, 255).astype(np.uint8)
+
+
+def make_pair(width: int, height: int, edits: int, noise: float, rng: np.random.Generator) -> SyntheticPair:
+    """Build a before/after pair with ``edits`` known rectangular or elliptical insertions."""
+    base = _textured_background(width, height, rng)
+    after = base.copy()
+
+    short_side = min(width, height)
+    min_size = max(24, short_side // 16)
+    max_size = max(min_size + 1, short_side // 6)
+
+    truth: list[Box] = []
+    attempts = 0
+    while len(truth) < edits and attempts < edits * 50:
+        attempts += 1
+        w = int(rng.integers(min_size, max_size))
+        h = int(rng.integers(min_size, max_size))
+        x = int(rng.integers(EDIT_MARGIN, max(EDIT_MARGIN + 1, width - w - EDIT_MARGIN)))
+        y = int(rng.integers(EDIT_MARGIN, max(EDIT_MARGIN + 1, height - h - EDIT_MARGIN)))
+        box = (x, y, w, h)
+        if _overlaps(box, truth, EDIT_MARGIN):
+            continue
+
+        region_mean = float(base[y:y + h, x:x + w].mean())
+        shade = int(rng.integers(0, 30)) if region_mean > 127 else int(rng.integers(225, 256))
+        color = (shade, int(np.clip(shade + rng.integers(-20, 21), 0, 255)), shade)
+        if rng.random() < 0.5:
+            cv2.rectangle(after, (x, y), (x + w - 1, y + h - 1), color, thickness=-1)
+        else:
+            center = (x + w // 2, y + h // 2)
+            cv2.ellipse(after, center, (w // 2, h // 2), 0, 0, 360, color, thickness=-1)
+        truth.append(box)
+
+    before = _add_noise(base, noise, rng)
+    after = _add_noise(after, noise, rng)
+    before_ok, before_png = cv2.imencode(".png", before)
+    after_ok, after_png = cv2.imencode(".png", after)
+    if not (before_ok and after_ok):
+        raise ValueError("Unable to encode synthetic pair.")
+    return SyntheticPair(before, after, truth, before_png.tobytes(), after_png.tobytes())
+
+
+def _iou(a: Box, b: Box) -> float:
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    inter_w = min(ax + aw, bx + bw) - max(ax, bx)
+    inter_h = min(ay + ah, by + bh) - max(ay, by)
+    if inter_w <= 0 or inter_h <= 0:
+        return 0.0
+    intersection = inter_w * inter_h
+    return intersection / float(aw * ah + bw * bh - intersection)
+
+
+def score_boxes(detected: list[Box], truth: list[Box], iou_threshold: float) -> dict:
+    """Greedy one-to-one matching of detected boxes to ground truth by IoU."""
+    candidates = sorted(
+        ((_iou(d, t), di, ti) for di, d in enumerate(detected) for ti, t in enumerate(truth)),
+        reverse=True,
+    )
+    matched_detected: set[int] = set()
+    matched_truth: set[int] = set()
+    ious: list[float] = []
+    for iou, di, ti in candidates:
+        if iou < iou_threshold:
+            break
+        if di in matched_detected or ti in matched_truth:
+            continue
+        matched_detected.add(di)
+        matched_truth.add(ti)
+        ious.append(iou)
+
+    tp = len(ious)
+    return {"tp": tp, "fp": len(detected) - tp, "fn": len(truth) - tp, "ious": ious}
+
+
+def _summarise_quality(scores: list[dict]) -> dict:
+    tp = sum(score["tp"] for score in scores)
+    fp = sum(score["fp"] for score in scores)
+    fn = sum(score["fn"] for score in scores)
+    ious = [iou for score in scores for iou in score["ious"]]
+    return {
+        "tp": tp,
+        "fp": fp,
+        "fn": fn,
+        "precision": tp / (tp + fp) if tp + fp else 1.0,
+        "recall": tp / (tp + fn) if tp + fn else 1.0,
+        "mean_iou": statistics.fmean(ious) if ious else 0.0,
+    }
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def _process_mode() -> Callable[[SyntheticPair], object] | None:
+    """Drive the real ``/process`` endpoint in-process when FastAPI's test client is available."""
+    try:
+        from fastapi.testclient import TestClient
+
+        import app as web_app
+    except Exception as exc:  # noqa: BLE001 - optional dependencies for this mode only
+        print(f"[benchmark] Skipping 'process' mode: {exc}", file=sys.stderr)
+        return None
+
+    web_app.OUTPUT_DIR = Path(tempfile.mkdtemp(prefix="task2_bench_"))
+    client = TestClient(web_app.app)
+
+    def run(pair: SyntheticPair) -> object:
+        response = client.post(
+            "/process",
+            files={
+                "before_image": ("before.png", pair.before_png, "image/png"),
+                "after_image": ("after.png", pair.after_png, "image/png"),
+            },
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"/process returned {response.status_code}")
+        return response
+
+    return run
+
+
+def _build_modes(include_process: bool) -> dict[str, Callable[[SyntheticPair], object]]:
+    modes: dict[str, Callable[[SyntheticPair], object]] = {
+        "find_change_boxes": lambda pair: find_change_boxes(pair.before, pair.after),
+        "annotate_changes": lambda pair: annotate_changes(pair.before, pair.after),
+    }
+    if include_process:
+        process = _process_mode()
+        if process is not None:
+            modes["process"] = process
+    return modes
+
+
+def time_mode(run: Callable[[SyntheticPair], object], pairs: list[SyntheticPair], iterations: int, warmup: int) -> dict:
+    for index in range(warmup):
+        run(pairs[index % len(pairs)])
+
+    latencies: list[float] = []
+    started = time.perf_counter()
+    for index in range(iterations):
+        pair = pairs[index % len(pairs)]
+        tick = time.perf_counter()
+        run(pair)
+        latencies.append((time.perf_counter() - tick) * 1000.0)
+    elapsed = time.perf_counter() - started
+
+    # Peak memory is measured on a separate pass so tracing does not skew the timings.
+    tracemalloc.start()
+    run(pairs[0])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "iterations": iterations,
+        "throughput_per_s": iterations / elapsed if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "mean": statistics.fmean(latencies),
+            "min": latencies[0],
+            "p50": _percentile(latencies, 50),
+            "p90": _percentile(latencies, 90),
+            "p99": _percentile(latencies, 99),
+            "max": latencies[-1],
+        },
+        "peak_traced_memory_bytes": peak,
+    }
+
+
+def run_benchmark(args: argparse.Namespace) -> dict:
+    rng = np.random.default_rng(args.seed)
+    modes = _build_modes(include_process=not args.skip_process)
+
+    cases = []
+    for width, height in args.resolutions:
+        for noise in args.noise:
+            pairs = [make_pair(width, height, args.edits, noise, rng) for _ in range(args.pairs)]
+            quality = _summarise_quality(
+                [score_boxes(find_change_boxes(p.before, p.after), p.truth, args.iou) for p in pairs]
+            )
+            timings = {name: time_mode(run, pairs, args.iterations, args.warmup) for name, run in modes.items()}
+            cases.append(
+                {
+                    "resolution": f"{width}x{height}",
+                    "megapixels": round(width * height / 1e6, 3),
+                    "noise_sigma": noise,
+                    "edits_per_pair": args.edits,
+                    "pairs": args.pairs,
+                    "quality": quality,
+                    "modes": timings,
+                }
+            )
+            print(
+                f"[benchmark] {width}x{height} noise={noise:g}: "
+                f"precision={quality['precision']:.3f} recall={quality['recall']:.3f} "
+                + " ".join(f"{name}={t['latency_ms']['p50']:.1f}ms" for name, t in timings.items()),
+                file=sys.stderr,
+            )
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+            "seed": args.seed,
+            "iou_threshold": args.iou,
+            "iterations": args.iterations,
+            "modes": list(modes),
+        },
+        "overall_quality": {
+            "precision": _weighted(cases, "precision"),
+            "recall": _weighted(cases, "recall"),
+        },
+        "cases": cases,
+    }
+
+
+def _weighted(cases: list[dict], metric: str) -> float:
+    tp = sum(case["quality"]["tp"] for case in cases)
+    other = sum(case["quality"]["fp" if metric == "precision" else "fn"] for case in cases)
+    return tp / (tp + other) if tp + other else 1.0
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the Task 2 change detector on synthetic ground truth.")
+    parser.add_argument("--resolutions", nargs="+", type=_parse_resolution,
+                        default=[_parse_resolution(r) for r in DEFAULT_RESOLUTIONS])
+    parser.add_argument("--noise", nargs="+", type=float, default=DEFAULT_NOISE_LEVELS,
+                        help="Gaussian noise sigma applied independently to each image.")
+    parser.add_argument("--edits", type=int, default=5, help="Inserted edits per pair.")
+    parser.add_argument("--pairs", type=int, default=3, help="Synthetic pairs generated per case.")
+    parser.add_argument("--iterations", type=int, default=10, help="Timed iterations per mode and case.")
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--iou", type=float, default=0.5, help="IoU needed for a detection to count as a match.")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--skip-process", action="store_true", help="Do not benchmark the /process endpoint.")
+    parser.add_argument("--output", type=Path, help="Write JSON results here instead of stdout.")
+    args = parser.parse_args(argv)
+    if args.pairs < 1 or args.iterations < 1 or args.edits < 0:
+        parser.error("--pairs and --iterations must be positive and --edits non-negative.")
+    return args
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    results = run_benchmark(args)
+    payload = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(payload, encoding="utf-8")
+        print(f"[benchmark] Results written to {args.output}", file=sys.stderr)
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Prometheus metrics for the change-detection app.
+
+The counters, gauges and histograms come from ``prometheus_client`` and live
+in this app's own ``REGISTRY``. ``MetricsMiddleware`` records request counts,
+latency, in-flight requests and response bytes, and emits a ``Server-Timing``
+header built from the stages the endpoint recorded on ``request.state.timings``.
+"""
+
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, disable_created_metrics
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTE_BUCKETS = (16e3, 64e3, 256e3, 1e6, 2e6, 4e6, 8e6, 16e6, 32e6, 64e6)
+MEGAPIXEL_BUCKETS = (0.1, 0.3, 0.5, 1.0, 2.0, 4.0, 8.0, 12.0, 16.0, 24.0, 50.0)
+
+disable_created_metrics()  # no *_created series; nothing scraping /metrics uses them
+REGISTRY = CollectorRegistry()
+
+REQUESTS = Counter(
+    "task2_http_requests_total", "HTTP requests handled.", ("method", "route", "status"), registry=REGISTRY
+)
+REQUEST_LATENCY = Histogram(
+    "task2_http_request_duration_seconds", "End-to-end request latency.", ("route",), registry=REGISTRY, buckets=LATENCY_BUCKETS
+)
+IN_FLIGHT = Gauge("task2_http_requests_in_flight", "Requests currently being served.", registry=REGISTRY)
+RESPONSE_BYTES = Counter("task2_http_response_bytes_total", "Response body bytes sent.", ("route",), registry=REGISTRY)
+STAGE_LATENCY = Histogram(
+    "task2_stage_duration_seconds", "Latency of each /process stage.", ("stage",), registry=REGISTRY, buckets=LATENCY_BUCKETS
+)
+UPLOAD_BYTES = Counter("task2_upload_bytes_total", "Bytes received in image uploads.", ("field",), registry=REGISTRY)
+UPLOAD_SIZE = Histogram(
+    "task2_upload_size_bytes", "Size of each uploaded image.", ("field",), registry=REGISTRY, buckets=BYTE_BUCKETS
+)
+IMAGE_MEGAPIXELS = Histogram(
+    "task2_image_megapixels", "Decoded image resolution in megapixels.", ("field",), registry=REGISTRY, buckets=MEGAPIXEL_BUCKETS
+)
+OUTPUT_BYTES = Counter(
+    "task2_output_bytes_total", "Bytes of annotated PNGs written to the output directory.", registry=REGISTRY
+)
+
+
+class StageTimer:
+    """Collects named stage durations for one request."""
+
+    __slots__ = ("stages",)
+
+    def __init__(self) -> None:
+        self.stages: list[tuple[str, float]] = []
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.stages.append((name, elapsed))
+            STAGE_LATENCY.labels(stage=name).observe(elapsed)
+
+    def server_timing(self, total: float) -> str:
+        entries = [f"{name};dur={elapsed * 1000:.2f}" for name, elapsed in self.stages]
+        entries.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(entries)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware so the hot path avoids ``BaseHTTPMiddleware`` overhead."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timer = StageTimer()
+        scope.setdefault("state", {})["timings"] = timer
+        started = time.perf_counter()
+        status = 500
+        sent = 0
+
+        async def send_wrapper(message) -> None:
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = timer.server_timing(time.perf_counter() - started).encode("latin-1")
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", header)]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            IN_FLIGHT.dec()
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            REQUESTS.labels(method=scope["method"], route=route_path, status=str(status)).inc()
+            REQUEST_LATENCY.labels(route=route_path).observe(time.perf_counter() - started)
+            RESPONSE_BYTES.labels(route=route_path).inc(sent)
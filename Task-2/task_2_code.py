@@ -4,8 +4,8 @@ import os
 import re
 
 
-def annotate_changes(before: np.ndarray, after: np.ndarray) -> np.ndarray:
-    """Return a copy of the after image with detected differences highlighted."""
+def find_change_boxes(before: np.ndarray, after: np.ndarray) -> list[tuple[int, int, int, int]]:
+    """Return ``(x, y, w, h)`` bounding boxes around regions that differ between the images."""
     if before is None or after is None:
         raise ValueError("Input images must be valid numpy arrays.")
 
@@ -29,11 +29,21 @@ def annotate_changes(before: np.ndarray, after: np.ndarray) -> np.ndarray:
     # Find contours representing changes
     contours, _ = cv2.findContours(dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
-    annotated = after.copy()
+    boxes = []
     for cnt in contours:
         if cv2.contourArea(cnt) > 200:  # Ignore tiny noise
             x, y, w, h = cv2.boundingRect(cnt)
-            cv2.rectangle(annotated, (x, y), (x + w, y + h), (0, 0, 255), 3)
+            boxes.append((x, y, w, h))
+    return boxes
+
+
+def annotate_changes(before: np.ndarray, after: np.ndarray) -> np.ndarray:
+    """Return a copy of the after image with detected differences highlighted."""
+    boxes = find_change_boxes(before, after)
+
+    annotated = after.copy()
+    for x, y, w, h in boxes:
+        cv2.rectangle(annotated, (x, y), (x + w, y + h), (0, 0, 255), 3)
 
     return annotated
 
@@ -1,20 +1,69 @@
+import os
 from functools import lru_cache
 from pathlib import Path
+from typing import Literal
 from pydantic_settings import BaseSettings
 
 ROOT_DIR = Path(__file__).resolve().parent.parent
-OUTPUT_DIR = ROOT_DIR / "task_3_output"
+OUTPUT_DIR = Path(os.environ.get("GLR_OUTPUT_DIR") or ROOT_DIR / "task_3_output")
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 DIAGNOSTICS_DIR = OUTPUT_DIR / "_diagnostics"
 DIAGNOSTICS_DIR.mkdir(parents=True, exist_ok=True)
+CACHE_DIR = OUTPUT_DIR / "_cache"
 
 
 class Settings(BaseSettings):
-    google_api_key: str
+    google_api_key: str = ""  # Required when llm_provider is "gemini"
+    llm_provider: Literal["gemini", "local"] = "gemini"  # "local": offline deterministic stand-in for load tests
+    local_llm_latency: float = 0.5  # Seconds per local-provider call
+    local_llm_jitter: float = 0.2  # +/- seconds added to each local call
+    local_llm_failure_rate: float = 0.0  # Share of local calls that fail with a simulated 503
+    local_llm_malformed_rate: float = 0.0  # Share of local answers cut short, as if truncated at the token limit
+    local_llm_seed: int = 0
     gemini_model: str = "gemini-2.5-flash"
     gemini_temperature: float = 0.0
     gemini_max_output_tokens: int = 8192  # Increased for longer responses
+    combined_extraction: bool = True  # First-seen templates: detect fields and extract values in one call
+    stream_extraction: bool = True  # Stream extraction responses so job clients see fields as they are generated
     max_report_chars: int = 15000  # Increased to capture more details from reports
+    extraction_mode: Literal["auto", "truncate", "map_reduce", "retrieval"] = "auto"  # auto: map-reduce only for long reports
+    chunk_overlap_chars: int = 1000  # Shared context between neighbouring map-reduce chunks
+    max_report_chunks: int = 12  # Chunks grow past max_report_chars rather than exceed this many calls
+    max_concurrent_chunk_calls: int = 4
+    retrieval_passage_chars: int = 800  # Passage size for the BM25 index
+    retrieval_group_size: int = 8  # Template fields sharing one retrieval prompt
+    retrieval_top_k: int = 6  # Passages chosen for a field group as a whole
+    retrieval_per_field_k: int = 2  # Extra passages chosen for each field on its own
+    retrieval_group_chars: int = 4000  # Passage characters sent per field group; the fallback round gets three times this
+    retrieval_fallback: bool = True  # Re-ask empty fields once with a wider passage selection
+    max_concurrent_runs: int = 4  # Pipeline runs allowed to execute at once; others wait
+    llm_requests_per_minute: int = 60  # Shared Gemini request budget for all runs; 0 disables
+    llm_tokens_per_minute: int = 1_000_000  # Shared budget of estimated prompt + response tokens; 0 disables
+    llm_max_attempts: int = 3  # Attempts per LLM call, each one admitted by the scheduler
+    llm_json_repair_rounds: int = 1  # Follow-up calls that ask only for fields missing from a malformed answer
+    llm_rate_limit_cooldown: float = 10.0  # Pause for all calls after a 429 without a retry hint
+    pdf_conversion_timeout: float = 30.0
+    pdf_converter_workers: int = 2  # Warm LibreOffice processes, each with its own profile
+    pdf_converter_health_interval: float = 30.0  # Seconds between idle-process health checks; 0 disables
+    soffice_path: str = "soffice"
+    job_workers: int = 4  # Background workers draining the /api/jobs queue
+    job_queue_size: int = 32  # Jobs allowed to wait; submissions beyond this get 503
+    batch_workers: int = 1  # Batches processed at once; their claims still share max_concurrent_runs
+    batch_queue_size: int = 4
+    batch_max_claims: int = 500
+    job_retention_seconds: float = 3600.0  # Finished jobs stay queryable this long
+    artifact_ttl_seconds: float = 7 * 86400.0  # Run outputs older than this are deleted; 0 keeps them
+    artifact_max_bytes: int = 2 * 1024**3  # Oldest runs are deleted once outputs exceed this; 0 disables
+    artifact_gc_interval: float = 600.0  # Seconds between garbage collections
+    pdf_workers: int = 0  # Processes for PDF text extraction; 0 uses every CPU
+    pdf_parallel_min_pages: int = 16  # Smaller claims are extracted in-process
+    compiled_template_cache_size: int = 32  # Parsed and indexed templates kept in memory
+    field_cache_size: int = 256  # Template field maps kept in memory
+    field_cache_persist: bool = True  # Also keep field maps on disk under task_3_output/_cache
+    extraction_cache_size: int = 512  # Extraction results kept in memory
+    extraction_cache_ttl_seconds: float = 86400.0
+    extraction_cache_persist: bool = True
+    extraction_cache_max_disk_entries: int = 5000
 
     class Config:
         env_file = ROOT_DIR / ".env"
@@ -1,19 +1,142 @@
 from __future__ import annotations
 
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from email.utils import formatdate, parsedate_to_datetime
 from pathlib import Path
-from typing import List
+from typing import Any, Dict, List
 
-from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi import FastAPI, File, Form, Header, HTTPException, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.responses import FileResponse, HTMLResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
-from backend.config import DIAGNOSTICS_DIR, OUTPUT_DIR, ROOT_DIR
-from backend.models import ErrorResponse, HealthResponse, PipelineSuccessResponse
-from backend.services.pipeline import GLRPipeline
+from backend.config import DIAGNOSTICS_DIR, OUTPUT_DIR, ROOT_DIR, get_settings
+from backend.models import (
+    BatchClaimResult,
+    BatchStatusResponse,
+    BatchSubmittedResponse,
+    CacheInvalidationResponse,
+    ErrorResponse,
+    HealthResponse,
+    JobStatusResponse,
+    JobSubmittedResponse,
+    PdfStatusResponse,
+    PipelineSuccessResponse,
+    ReadinessResponse,
+)
+from backend.services import metrics
+from backend.services.jobs import Job, JobManager, QueueFullError
+from backend.services.llm_scheduler import get_scheduler
+from backend.services.pdf_conversion import PDF_PENDING, PDF_READY, PDF_UNAVAILABLE
+from backend.services.pipeline import PipelineResult, get_pipeline
+from backend.services.warmup import READY, WarmUp
+
+
+async def _run_job(job: Job) -> Dict[str, Any]:
+    template_bytes, pdf_payloads = job.payload
+    result = await get_pipeline().run(
+        template_bytes,
+        pdf_payloads,
+        progress=job.report_stage,
+        on_field=lambda name, value: job.publish("field", {"field": name, "value": value}),
+    )
+    # Let the client show the DOCX result while the PDF is still converting.
+    job.publish("document", _success_response(result).model_dump())
+    await get_pipeline().converter.wait(result.run_id)
+    return _success_response(result).model_dump()
+
+
+async def _run_batch(job: Job) -> Dict[str, Any]:
+    """Run every claim of a batch concurrently against one template.
+
+    Claims queue on the pipeline's run slots and their LLM calls on the shared
+    scheduler, so the batch fans out as far as the configured budgets allow.
+    """
+    template_bytes, claims = job.payload
+    state: Dict[str, Any] = {
+        "claims": [{"claim_id": claim_id, "status": "queued", "stage": "queued"} for claim_id, _ in claims]
+    }
+    job.result = state
+    entries = state["claims"]
+    job.report_stage("running", {"claims": len(claims)})
+
+    async def run_claim(index: int, pdf_payloads: List[bytes]) -> None:
+        entry = entries[index]
+
+        def on_progress(stage: str, details: Dict[str, Any]) -> None:
+            entry["status"] = "running"
+            entry["stage"] = stage
+
+        try:
+            result = await get_pipeline().run(template_bytes, pdf_payloads, progress=on_progress)
+            await get_pipeline().converter.wait(result.run_id)
+            entry.update(status="completed", stage="completed", result=_success_response(result).model_dump())
+        except ValueError as exc:
+            entry.update(status="failed", stage="failed", error=str(exc))
+        except Exception as exc:  # noqa: BLE001 - one failing claim must not sink the batch
+            print(f"[main] Batch {job.id} claim {entry['claim_id']} failed: {exc!r}")
+            entry.update(status="failed", stage="failed", error="Pipeline failed; see server logs")
+        finally:
+            pdf_payloads.clear()  # release this claim's uploads as soon as it is done
+        job.publish(
+            "claim",
+            {
+                "index": index,
+                "claim_id": entry["claim_id"],
+                "status": entry["status"],
+                "error": entry.get("error"),
+                **_batch_counts(entries),
+            },
+        )
+
+    await asyncio.gather(*(run_claim(index, pdf_payloads) for index, (_, pdf_payloads) in enumerate(claims)))
+    return state
+
+
+def _batch_counts(entries: List[Dict[str, Any]]) -> Dict[str, int]:
+    return {
+        "total": len(entries),
+        "completed": sum(1 for entry in entries if entry["status"] == "completed"),
+        "failed": sum(1 for entry in entries if entry["status"] == "failed"),
+    }
 
-app = FastAPI(title="GLR Insurance Pipeline", version="0.1.0")
-pipeline = GLRPipeline()
+
+settings = get_settings()
+jobs = JobManager(
+    _run_job,
+    workers=settings.job_workers,
+    max_queue=settings.job_queue_size,
+    retention_seconds=settings.job_retention_seconds,
+)
+batches = JobManager(
+    _run_batch,
+    workers=settings.batch_workers,
+    max_queue=settings.batch_queue_size,
+    retention_seconds=settings.job_retention_seconds,
+)
+warm_up = WarmUp()
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    await jobs.start()
+    await batches.start()
+    # Runs in the background: liveness answers at once, readiness once this finishes.
+    warm_up.start()
+    try:
+        yield
+    finally:
+        await warm_up.stop()
+        await batches.stop()
+        await jobs.stop()
+        await get_pipeline().artifacts.stop()
+        await get_pipeline().converter.stop()
+
+
+app = FastAPI(title="GLR Insurance Pipeline", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -37,15 +160,31 @@ def serve_frontend() -> HTMLResponse:
 
 
 @app.get("/health", response_model=HealthResponse)
+@app.get("/health/live", response_model=HealthResponse)
 def healthcheck() -> HealthResponse:
+    """Liveness: the process is up and serving, even while it is still warming up."""
     return HealthResponse(status="ok", version=app.version)
 
 
-@app.post("/api/glr", response_model=PipelineSuccessResponse, responses={400: {"model": ErrorResponse}})
-async def run_pipeline(
-    template: UploadFile = File(..., description="Insurance template in .docx format"),
-    reports: List[UploadFile] = File(..., description="One or more photo reports in .pdf format"),
-) -> PipelineSuccessResponse:
+@app.get("/health/ready", response_model=ReadinessResponse, responses={503: {"model": ReadinessResponse}})
+def readiness(response: Response) -> ReadinessResponse:
+    """Readiness: the LLM client, PDF converter and document libraries are loaded."""
+    if warm_up.status != READY:
+        response.status_code = 503
+    return ReadinessResponse(
+        status=warm_up.status, version=app.version, warm_up_seconds=warm_up.seconds, error=warm_up.error
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint() -> PlainTextResponse:
+    metrics.LLM_WAITING.set(get_scheduler().waiting)
+    metrics.QUEUE_DEPTH.labels(queue="jobs").set(jobs.queue_depth)
+    metrics.QUEUE_DEPTH.labels(queue="batches").set(batches.queue_depth)
+    return PlainTextResponse(generate_latest(metrics.REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
+
+async def _read_uploads(template: UploadFile, reports: List[UploadFile]) -> tuple[bytes, List[bytes]]:
     if template.content_type not in ("application/vnd.openxmlformats-officedocument.wordprocessingml.document", "application/msword"):
         raise HTTPException(status_code=400, detail="Template must be a .docx file")
     if not reports:
@@ -57,25 +196,30 @@ async def run_pipeline(
         if upload.content_type != "application/pdf":
             raise HTTPException(status_code=400, detail=f"{upload.filename} is not a PDF")
         pdf_payloads.append(await upload.read())
+    return template_bytes, pdf_payloads
+
+
+def _pdf_status(run_id: str) -> str:
+    status = get_pipeline().converter.status(run_id)
+    if status is not None:
+        return status
+    # Runs from before a restart: the PDF either exists on disk or never will.
+    if get_pipeline().artifacts.get(run_id, "pdf") is not None:
+        return PDF_READY
+    return PDF_READY if (OUTPUT_DIR / f"filled_template_{run_id}.pdf").exists() else PDF_UNAVAILABLE
 
-    try:
-        result = pipeline.run(template_bytes, pdf_payloads)
-    except ValueError as exc:
-        raise HTTPException(status_code=400, detail=str(exc)) from exc
 
+def _success_response(result: PipelineResult) -> PipelineSuccessResponse:
     download_url = f"/api/download/{result.run_id}"
-    pdf_url = f"/api/download-pdf/{result.run_id}"
     diagnostics_url = f"/api/diagnostics/{result.run_id}"
-    
-    # Check if PDF was actually generated
-    pdf_path = OUTPUT_DIR / f"filled_template_{result.run_id}.pdf"
-    if not pdf_path.exists():
-        pdf_url = None
+    pdf_status = _pdf_status(result.run_id)
+    pdf_url = f"/api/download-pdf/{result.run_id}" if pdf_status != PDF_UNAVAILABLE else None
 
     return PipelineSuccessResponse(
         run_id=result.run_id,
         download_url=download_url,
         pdf_url=pdf_url,
+        pdf_status=pdf_status,
         diagnostics_url=diagnostics_url,
         extracted_fields=result.extracted_fields,
         filled_values=result.filled_values,
@@ -83,25 +227,269 @@ async def run_pipeline(
     )
 
 
+@app.post("/api/glr", response_model=PipelineSuccessResponse, responses={400: {"model": ErrorResponse}})
+async def run_pipeline(
+    template: UploadFile = File(..., description="Insurance template in .docx format"),
+    reports: List[UploadFile] = File(..., description="One or more photo reports in .pdf format"),
+) -> PipelineSuccessResponse:
+    template_bytes, pdf_payloads = await _read_uploads(template, reports)
+
+    try:
+        result = await get_pipeline().run(template_bytes, pdf_payloads)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    return _success_response(result)
+
+
+@app.post(
+    "/api/jobs",
+    response_model=JobSubmittedResponse,
+    status_code=202,
+    responses={400: {"model": ErrorResponse}, 503: {"model": ErrorResponse}},
+)
+async def submit_job(
+    template: UploadFile = File(..., description="Insurance template in .docx format"),
+    reports: List[UploadFile] = File(..., description="One or more photo reports in .pdf format"),
+) -> JobSubmittedResponse:
+    template_bytes, pdf_payloads = await _read_uploads(template, reports)
+    if not template_bytes:
+        raise HTTPException(status_code=400, detail="Template file is empty")
+
+    try:
+        job = jobs.submit((template_bytes, pdf_payloads))
+    except QueueFullError as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "30"}) from exc
+
+    return JobSubmittedResponse(
+        job_id=job.id,
+        status=job.status,
+        status_url=f"/api/jobs/{job.id}",
+        events_url=f"/api/jobs/{job.id}/events",
+    )
+
+
+def _get_job(job_id: str) -> Job:
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/api/jobs/{job_id}", response_model=JobStatusResponse)
+def job_status(job_id: str) -> JobStatusResponse:
+    job = _get_job(job_id)
+    return JobStatusResponse(
+        job_id=job.id,
+        status=job.status,
+        stage=job.stage,
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+        result=job.result,
+        error=job.error,
+    )
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str, last_event_id: str | None = Header(default=None)) -> StreamingResponse:
+    job = _get_job(job_id)
+    resume_after = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+    return StreamingResponse(
+        jobs.stream(job, resume_after),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post(
+    "/api/batches",
+    response_model=BatchSubmittedResponse,
+    status_code=202,
+    responses={400: {"model": ErrorResponse}, 503: {"model": ErrorResponse}},
+)
+async def submit_batch(
+    template: UploadFile = File(..., description="Insurance template in .docx format, shared by every claim"),
+    reports: List[UploadFile] = File(..., description="PDF reports for all claims in the batch"),
+    claim_ids: List[str] | None = Form(
+        default=None,
+        description="Claim id for each report, in upload order; reports with the same id form one claim. "
+        "Omit to treat every report as its own claim.",
+    ),
+) -> BatchSubmittedResponse:
+    template_bytes, pdf_payloads = await _read_uploads(template, reports)
+    if not template_bytes:
+        raise HTTPException(status_code=400, detail="Template file is empty")
+    if claim_ids is None:
+        claim_ids = [upload.filename or f"claim-{index + 1}" for index, upload in enumerate(reports)]
+    if len(claim_ids) != len(pdf_payloads):
+        raise HTTPException(status_code=400, detail="Provide one claim_ids entry per report")
+
+    grouped: Dict[str, List[bytes]] = {}
+    for claim_id, content in zip(claim_ids, pdf_payloads):
+        grouped.setdefault(claim_id, []).append(content)
+    if len(grouped) > settings.batch_max_claims:
+        raise HTTPException(status_code=400, detail=f"A batch may contain at most {settings.batch_max_claims} claims")
+
+    try:
+        job = batches.submit((template_bytes, list(grouped.items())))
+    except QueueFullError as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "60"}) from exc
+
+    return BatchSubmittedResponse(
+        batch_id=job.id,
+        status=job.status,
+        claims=len(grouped),
+        status_url=f"/api/batches/{job.id}",
+        events_url=f"/api/batches/{job.id}/events",
+    )
+
+
+def _get_batch(batch_id: str) -> Job:
+    job = batches.get(batch_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return job
+
+
+@app.get("/api/batches/{batch_id}", response_model=BatchStatusResponse)
+def batch_status(batch_id: str) -> BatchStatusResponse:
+    job = _get_batch(batch_id)
+    entries = (job.result or {}).get("claims", [])
+    return BatchStatusResponse(
+        batch_id=job.id,
+        status=job.status,
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+        claims=[BatchClaimResult(**entry) for entry in entries],
+        error=job.error,
+        **_batch_counts(entries),
+    )
+
+
+@app.get("/api/batches/{batch_id}/events")
+async def batch_events(batch_id: str, last_event_id: str | None = Header(default=None)) -> StreamingResponse:
+    job = _get_batch(batch_id)
+    resume_after = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+    return StreamingResponse(
+        batches.stream(job, resume_after),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+ARTIFACT_CACHE_CONTROL = "private, max-age=86400"
+DOCX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+class _ArtifactFileResponse(FileResponse):
+    """FileResponse whose If-Range check uses the ETag and Last-Modified sent with it.
+
+    Starlette compares If-Range against its own mtime-based ETag, which would
+    turn every resumed download of a content-addressed file into a full one.
+    """
+
+    def _should_use_range(self, http_if_range: str, stat_result: os.stat_result) -> bool:
+        return http_if_range in (self.headers.get("etag"), self.headers.get("last-modified"))
+
+
+def _not_modified(request: Request, etag: str, modified: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _conditional_file(
+    request: Request,
+    path: Path,
+    filename: str,
+    etag: str,
+    cache_control: str,
+    media_type: str | None = None,
+) -> Response:
+    """Serve ``path`` with validators so clients can revalidate (304) and resume (206)."""
+    try:
+        stat_result = path.stat()
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found") from None
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "Cache-Control": cache_control,
+    }
+    if _not_modified(request, etag, stat_result.st_mtime):
+        return Response(status_code=304, headers=headers)
+    return _ArtifactFileResponse(
+        path, filename=filename, media_type=media_type, headers=headers, stat_result=stat_result
+    )
+
+
+def _artifact_response(request: Request, run_id: str, kind: str, media_type: str) -> Response | None:
+    filename = f"filled_template_{run_id}.{kind}"
+    artifact = get_pipeline().artifacts.get(run_id, kind)
+    if artifact is not None:
+        # Stored files never change, so their content hash is a strong validator.
+        etag = f'"{artifact.sha256}"'
+        return _conditional_file(request, artifact.path, filename, etag, ARTIFACT_CACHE_CONTROL, media_type)
+    legacy_path = OUTPUT_DIR / filename  # written before outputs were content-addressed
+    try:
+        stat_result = legacy_path.stat()
+    except FileNotFoundError:
+        return None
+    etag = f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+    return _conditional_file(request, legacy_path, filename, etag, ARTIFACT_CACHE_CONTROL, media_type)
+
+
 @app.get("/api/download/{run_id}")
-def download_document(run_id: str) -> FileResponse:
-    file_path = OUTPUT_DIR / f"filled_template_{run_id}.docx"
-    if not file_path.exists():
+def download_document(run_id: str, request: Request) -> Response:
+    response = _artifact_response(request, run_id, "docx", DOCX_MEDIA_TYPE)
+    if response is None:
         raise HTTPException(status_code=404, detail="Document not found")
-    return FileResponse(file_path, filename=file_path.name)
+    return response
+
+
+@app.get("/api/pdf-status/{run_id}", response_model=PdfStatusResponse)
+def pdf_status(run_id: str) -> PdfStatusResponse:
+    status = _pdf_status(run_id)
+    pdf_url = f"/api/download-pdf/{run_id}" if status == PDF_READY else None
+    return PdfStatusResponse(run_id=run_id, pdf_status=status, pdf_url=pdf_url)
 
 
 @app.get("/api/download-pdf/{run_id}")
-def download_pdf(run_id: str) -> FileResponse:
-    file_path = OUTPUT_DIR / f"filled_template_{run_id}.pdf"
-    if not file_path.exists():
+def download_pdf(run_id: str, request: Request) -> Response:
+    if _pdf_status(run_id) == PDF_PENDING:
+        raise HTTPException(status_code=409, detail="PDF conversion still in progress", headers={"Retry-After": "1"})
+    response = _artifact_response(request, run_id, "pdf", "application/pdf")
+    if response is None:
         raise HTTPException(status_code=404, detail="PDF not found. LibreOffice may not be installed.")
-    return FileResponse(file_path, filename=file_path.name, media_type="application/pdf")
+    return response
 
 
 @app.get("/api/diagnostics/{run_id}")
-def fetch_diagnostics(run_id: str) -> FileResponse:
+def fetch_diagnostics(run_id: str, request: Request) -> Response:
     diag_path = DIAGNOSTICS_DIR / f"pipeline_run_{run_id}.json"
-    if not diag_path.exists():
-        raise HTTPException(status_code=404, detail="Diagnostics not found")
-    return FileResponse(diag_path, filename=diag_path.name)
+    try:
+        stat_result = diag_path.stat()
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Diagnostics not found") from None
+    # Rewritten when the PDF outcome is recorded, so clients revalidate every time.
+    etag = f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+    return _conditional_file(request, diag_path, diag_path.name, etag, "no-cache")
+
+
+@app.delete("/api/cache/template-fields", response_model=CacheInvalidationResponse)
+def invalidate_template_fields(template_sha256: str | None = None) -> CacheInvalidationResponse:
+    removed = get_pipeline().invalidate_field_cache(template_sha256.lower() if template_sha256 else None)
+    return CacheInvalidationResponse(cache="template_fields", removed=removed)
+
+
+@app.delete("/api/cache/extraction", response_model=CacheInvalidationResponse)
+def invalidate_extraction_cache() -> CacheInvalidationResponse:
+    return CacheInvalidationResponse(cache="extraction", removed=get_pipeline().extraction_cache.invalidate())
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Dict
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel
 
@@ -10,15 +10,79 @@ class HealthResponse(BaseModel):
     version: str
 
 
+class ReadinessResponse(BaseModel):
+    status: str  # warming_up | ready | failed
+    version: str
+    warm_up_seconds: Dict[str, float]  # completed warm-up steps
+    error: Optional[str] = None
+
+
 class PipelineSuccessResponse(BaseModel):
     run_id: str
     download_url: str
     pdf_url: str | None = None
+    pdf_status: str = "unavailable"  # pending | ready | unavailable
     diagnostics_url: str
     extracted_fields: Dict[str, str]
     filled_values: Dict[str, str]
     report_excerpt: str
 
 
+class PdfStatusResponse(BaseModel):
+    run_id: str
+    pdf_status: str
+    pdf_url: Optional[str] = None
+
+
+class JobSubmittedResponse(BaseModel):
+    job_id: str
+    status: str
+    status_url: str
+    events_url: str
+
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    status: str
+    stage: str
+    created_at: float
+    finished_at: Optional[float] = None
+    result: Optional[PipelineSuccessResponse] = None
+    error: Optional[str] = None
+
+
+class BatchSubmittedResponse(BaseModel):
+    batch_id: str
+    status: str
+    claims: int
+    status_url: str
+    events_url: str
+
+
+class BatchClaimResult(BaseModel):
+    claim_id: str
+    status: str  # queued | running | completed | failed
+    stage: str = "queued"
+    result: Optional[PipelineSuccessResponse] = None
+    error: Optional[str] = None
+
+
+class BatchStatusResponse(BaseModel):
+    batch_id: str
+    status: str
+    created_at: float
+    finished_at: Optional[float] = None
+    total: int
+    completed: int
+    failed: int
+    claims: List[BatchClaimResult]
+    error: Optional[str] = None
+
+
+class CacheInvalidationResponse(BaseModel):
+    cache: str
+    removed: int
+
+
 class ErrorResponse(BaseModel):
     detail: str
@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from backend.services.metrics import ARTIFACT_BYTES, ARTIFACT_DEDUPLICATED, ARTIFACT_GC_DELETED
+
+_RUN_ID_RE = re.compile(r"[0-9a-f]{32}")
+
+
+@dataclass
+class Artifact:
+    sha256: str
+    size: int
+    suffix: str
+    path: Path
+    modified: float  # When these bytes were first stored; shared by every run that produced them
+
+
+class ArtifactStore:
+    """Content-addressed store for run outputs with background garbage collection.
+
+    Each output is written once under ``_artifacts/<sha[:2]>/<sha><suffix>``; runs
+    that produce identical bytes share that blob. A small manifest per run in
+    ``_runs`` maps the run's artifact kinds (``docx``, ``pdf``) to blobs and lists
+    the run's own mutable files, such as its diagnostics JSON.
+
+    ``collect`` deletes runs older than ``ttl_seconds``, then the oldest runs
+    until the blobs and files still referenced fit ``max_bytes``, then every
+    blob no run references. Outputs written before this store existed are left
+    alone.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        ttl_seconds: float,
+        max_bytes: int,
+        gc_interval: float,
+    ) -> None:
+        self.root = root
+        self.blob_dir = root / "_artifacts"
+        self.staging_dir = self.blob_dir / "_staging"
+        self.run_dir = root / "_runs"
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.gc_interval = gc_interval
+        self._lock = threading.Lock()
+        self._gc_task: Optional[asyncio.Task] = None
+        for directory in (self.blob_dir, self.staging_dir, self.run_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+
+    async def start(self) -> None:
+        if self._gc_task is None and self.gc_interval > 0 and (self.ttl_seconds > 0 or self.max_bytes > 0):
+            self._gc_task = asyncio.create_task(self._gc_loop())
+
+    async def stop(self) -> None:
+        if self._gc_task is not None:
+            self._gc_task.cancel()
+            self._gc_task = None
+
+    async def _gc_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.collect)
+            except Exception as exc:  # noqa: BLE001 - keep collecting on the next tick
+                print(f"[artifacts] Garbage collection failed: {exc}")
+            await asyncio.sleep(self.gc_interval)
+
+    # Writing
+
+    def staging_path(self, run_id: str, suffix: str) -> Path:
+        """Where a producer (the PDF converter) writes a file before ``put_file`` stores it."""
+        return self.staging_dir / f"{run_id}{suffix}"
+
+    def put_bytes(self, run_id: str, kind: str, data: bytes, suffix: str) -> Artifact:
+        sha256 = hashlib.sha256(data).hexdigest()
+        # Written even when the blob exists: collection may delete it before the commit below.
+        tmp_path = self.staging_dir / f"{sha256}.{os.getpid()}.{threading.get_ident()}.tmp"
+        tmp_path.write_bytes(data)
+        return self._commit(run_id, kind, sha256, len(data), suffix, tmp_path)
+
+    def put_file(self, run_id: str, kind: str, source: Path, suffix: str) -> Artifact:
+        """Store ``source`` (which is moved or, if already stored, deleted)."""
+        digest = hashlib.sha256()
+        with source.open("rb") as handle:
+            for block in iter(lambda: handle.read(1 << 20), b""):
+                digest.update(block)
+        return self._commit(run_id, kind, digest.hexdigest(), source.stat().st_size, suffix, source)
+
+    def _commit(self, run_id: str, kind: str, sha256: str, size: int, suffix: str, source: Path) -> Artifact:
+        path = self._blob_path(sha256, suffix)
+        with self._lock:
+            if path.exists():
+                ARTIFACT_DEDUPLICATED.labels(kind=kind).inc()
+                source.unlink(missing_ok=True)
+            else:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                shutil.move(str(source), path)
+            manifest = self._read_manifest(run_id) or {"run_id": run_id, "created": time.time(), "artifacts": {}, "files": {}}
+            manifest["artifacts"][kind] = {"sha256": sha256, "size": size, "suffix": suffix}
+            self._write_manifest(run_id, manifest)
+        return Artifact(sha256=sha256, size=size, suffix=suffix, path=path, modified=path.stat().st_mtime)
+
+    def attach(self, run_id: str, name: str, path: Path) -> None:
+        """Make ``path`` part of the run so it is deleted along with the run's artifacts."""
+        with self._lock:
+            manifest = self._read_manifest(run_id) or {"run_id": run_id, "created": time.time(), "artifacts": {}, "files": {}}
+            manifest["files"][name] = str(path.relative_to(self.root))
+            self._write_manifest(run_id, manifest)
+
+    # Reading
+
+    def get(self, run_id: str, kind: str) -> Optional[Artifact]:
+        if not _RUN_ID_RE.fullmatch(run_id):
+            return None
+        entry = (self._read_manifest(run_id) or {}).get("artifacts", {}).get(kind)
+        if entry is None:
+            return None
+        path = self._blob_path(entry["sha256"], entry["suffix"])
+        try:
+            modified = path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+        return Artifact(sha256=entry["sha256"], size=entry["size"], suffix=entry["suffix"], path=path, modified=modified)
+
+    def _blob_path(self, sha256: str, suffix: str) -> Path:
+        return self.blob_dir / sha256[:2] / f"{sha256}{suffix}"
+
+    def _manifest_path(self, run_id: str) -> Path:
+        return self.run_dir / f"{run_id}.json"
+
+    def _read_manifest(self, run_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads(self._manifest_path(run_id).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError) as exc:
+            print(f"[artifacts] Unreadable manifest for run {run_id}: {exc}")
+            return None
+
+    def _write_manifest(self, run_id: str, manifest: Dict[str, Any]) -> None:
+        path = self._manifest_path(run_id)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps(manifest), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    # Garbage collection
+
+    def collect(self) -> Dict[str, int]:
+        """Apply the TTL and size bound; returns what was deleted and the bytes still stored."""
+        now = time.time()
+        deleted = Counter()
+        with self._lock:
+            runs: List[Dict[str, Any]] = []
+            for path in self.run_dir.glob("*.json"):
+                manifest = self._read_manifest(path.stem)
+                if manifest is None:
+                    path.unlink(missing_ok=True)
+                    continue
+                runs.append(manifest)
+            runs.sort(key=lambda manifest: manifest.get("created", 0.0))
+
+            blobs: Dict[str, int] = {}
+            for path in self.blob_dir.glob("??/*"):
+                try:
+                    blobs[path.name] = path.stat().st_size
+                except FileNotFoundError:
+                    continue
+
+            live: List[Dict[str, Any]] = []
+            for manifest in runs:
+                if self.ttl_seconds > 0 and now - manifest.get("created", 0.0) > self.ttl_seconds:
+                    self._delete_run(manifest)
+                    deleted["runs"] += 1
+                else:
+                    live.append(manifest)
+
+            references = Counter(name for manifest in live for name in self._blob_names(manifest))
+            file_sizes = {id(manifest): self._file_bytes(manifest) for manifest in live}
+            total = sum(blobs.get(name, 0) for name in references) + sum(file_sizes.values())
+            while self.max_bytes > 0 and total > self.max_bytes and live:
+                manifest = live.pop(0)  # oldest first
+                for name in self._blob_names(manifest):
+                    references[name] -= 1
+                    if references[name] == 0:
+                        total -= blobs.get(name, 0)
+                        del references[name]
+                total -= file_sizes[id(manifest)]
+                self._delete_run(manifest)
+                deleted["runs"] += 1
+
+            for name in blobs:
+                if name not in references:
+                    path = self.blob_dir / name[:2] / name
+                    path.unlink(missing_ok=True)
+                    deleted["blobs"] += 1
+                    try:
+                        path.parent.rmdir()
+                    except OSError:
+                        pass  # other blobs share the directory
+
+            # Left behind by conversions that never finished.
+            for path in self.staging_dir.iterdir():
+                try:
+                    if self.ttl_seconds > 0 and now - path.stat().st_mtime > self.ttl_seconds:
+                        path.unlink()
+                        deleted["files"] += 1
+                except FileNotFoundError:
+                    continue
+
+        for kind, count in deleted.items():
+            ARTIFACT_GC_DELETED.labels(kind=kind).inc(count)
+        ARTIFACT_BYTES.set(total)
+        if deleted:
+            print(f"[artifacts] Garbage collection deleted {dict(deleted)}; {total} bytes remain")
+        return {**deleted, "bytes": total}
+
+    @staticmethod
+    def _blob_names(manifest: Dict[str, Any]) -> List[str]:
+        return [entry["sha256"] + entry["suffix"] for entry in manifest.get("artifacts", {}).values()]
+
+    def _file_bytes(self, manifest: Dict[str, Any]) -> int:
+        size = 0
+        for relative in manifest.get("files", {}).values():
+            try:
+                size += (self.root / relative).stat().st_size
+            except FileNotFoundError:
+                continue
+        return size
+
+    def _delete_run(self, manifest: Dict[str, Any]) -> None:
+        for relative in manifest.get("files", {}).values():
+            (self.root / relative).unlink(missing_ok=True)
+        self._manifest_path(manifest["run_id"]).unlink(missing_ok=True)
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+
+def content_hash(*parts: bytes | str) -> str:
+    """SHA-256 over ``parts``; each part is length-prefixed so boundaries can't collide."""
+    digest = hashlib.sha256()
+    for part in parts:
+        data = part.encode("utf-8") if isinstance(part, str) else part
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class JSONCache:
+    """Bounded in-memory LRU with an optional on-disk tier of JSON files.
+
+    Values must be JSON-serialisable when ``directory`` is set. Entries older than
+    ``ttl_seconds`` are treated as missing in both tiers. Async callers use
+    ``aget``/``aset``, which serve memory hits inline and move disk reads,
+    writes and pruning off the event loop.
+    """
+
+    _PRUNE_EVERY = 32
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int,
+        directory: Optional[Path] = None,
+        ttl_seconds: Optional[float] = None,
+        max_disk_entries: Optional[int] = None,
+    ) -> None:
+        self.name = name
+        self.max_entries = max(1, max_entries)
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        if directory is not None:
+            directory.mkdir(parents=True, exist_ok=True)
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - stored_at > self.ttl_seconds
+
+    def _path(self, key: str) -> Path:
+        assert self.directory is not None
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Any | None:
+        found, value = self._get_memory(key)
+        if found:
+            return value
+        return self._finish_get(key, self._read_disk(key))
+
+    async def aget(self, key: str) -> Any | None:
+        found, value = self._get_memory(key)
+        if found:
+            return value
+        entry = await asyncio.to_thread(self._read_disk, key) if self.directory is not None else None
+        return self._finish_get(key, entry)
+
+    def set(self, key: str, value: Any) -> None:
+        self._write_disk(key, *self._set_memory(key, value))
+
+    async def aset(self, key: str, value: Any) -> None:
+        stored_at, value = self._set_memory(key, value)
+        if self.directory is not None:
+            await asyncio.to_thread(self._write_disk, key, stored_at, value)
+
+    def _get_memory(self, key: str) -> tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self._expired(entry[0]):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, entry[1]
+                del self._entries[key]
+        return False, None
+
+    def _finish_get(self, key: str, entry: tuple[float, Any] | None) -> Any | None:
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, entry)
+        return entry[1]
+
+    def _set_memory(self, key: str, value: Any) -> tuple[float, Any]:
+        stored_at = time.time()
+        with self._lock:
+            self._remember(key, (stored_at, value))
+        return stored_at, value
+
+    def invalidate(self, key: Optional[str] = None) -> int:
+        """Drop one entry, or every entry when ``key`` is None. Returns the number removed."""
+        with self._lock:
+            if key is None:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                removed = 1 if self._entries.pop(key, None) is not None else 0
+
+        if self.directory is None:
+            return removed
+        paths = list(self.directory.glob("*.json")) if key is None else [self._path(key)]
+        disk_removed = 0
+        for path in paths:
+            try:
+                path.unlink()
+                disk_removed += 1
+            except FileNotFoundError:
+                pass
+        return max(removed, disk_removed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"name": self.name, "entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def _remember(self, key: str, entry: tuple[float, Any]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read_disk(self, key: str) -> tuple[float, Any] | None:
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            payload = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError) as exc:
+            print(f"[cache] Discarding unreadable {self.name} entry {path.name}: {exc}")
+            path.unlink(missing_ok=True)
+            return None
+        stored_at = float(payload.get("stored_at", 0))
+        if self._expired(stored_at):
+            path.unlink(missing_ok=True)
+            return None
+        return stored_at, payload.get("value")
+
+    def _write_disk(self, key: str, stored_at: float, value: Any) -> None:
+        if self.directory is None:
+            return
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            tmp_path.write_text(json.dumps({"stored_at": stored_at, "value": value}), encoding="utf-8")
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            print(f"[cache] Could not persist {self.name} entry: {exc}")
+            tmp_path.unlink(missing_ok=True)
+            return
+
+        with self._lock:
+            self._writes += 1
+            prune = self.max_disk_entries is not None and self._writes % self._PRUNE_EVERY == 0
+        if prune:
+            self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        assert self.directory is not None and self.max_disk_entries is not None
+        files = []
+        for path in self.directory.glob("*.json"):
+            try:
+                files.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue
+        files.sort()
+        for _, path in files[: max(0, len(files) - self.max_disk_entries)]:
+            path.unlink(missing_ok=True)
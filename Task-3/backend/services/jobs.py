@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+class QueueFullError(RuntimeError):
+    pass
+
+
+@dataclass
+class Job:
+    id: str
+    payload: Any
+    status: str = "queued"
+    stage: str = "queued"
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    _changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    def report_stage(self, stage: str, details: Optional[Dict[str, Any]] = None) -> None:
+        self.stage = stage
+        self.publish("progress", {"stage": stage, **(details or {})})
+
+    def publish(self, event: str, data: Dict[str, Any]) -> None:
+        """Record an event and wake any stream waiting on this job. Must run on the event loop."""
+        self.events.append({"id": len(self.events) + 1, "event": event, "data": data})
+        # Waiters hold the old event; a fresh one is armed for the next publish.
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait_for_events(self, seen: int, timeout: float) -> None:
+        if len(self.events) > seen or self.finished:
+            return
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+JobRunner = Callable[[Job], Awaitable[Dict[str, Any]]]
+
+
+class JobManager:
+    """Bounded queue of pipeline jobs drained by a fixed pool of asyncio workers."""
+
+    def __init__(self, runner: JobRunner, workers: int, max_queue: int, retention_seconds: float) -> None:
+        self.runner = runner
+        self.worker_count = max(1, workers)
+        self.retention_seconds = retention_seconds
+        self._queue: asyncio.Queue[Job] = asyncio.Queue(maxsize=max(1, max_queue))
+        self._jobs: Dict[str, Job] = {}
+        self._workers: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        if self._workers:
+            return
+        self._workers = [asyncio.create_task(self._work(), name=f"glr-job-worker-{i}") for i in range(self.worker_count)]
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def capacity(self) -> int:
+        return self._queue.maxsize - self._queue.qsize()
+
+    def submit(self, payload: Any) -> Job:
+        self._prune()
+        job = Job(id=uuid.uuid4().hex, payload=payload)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull as exc:
+            raise QueueFullError("Job queue is full; retry later") from exc
+        self._jobs[job.id] = job
+        job.report_stage("queued", {"position": self._queue.qsize()})
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    async def stream(self, job: Job, last_event_id: int = 0, keepalive: float = 15.0) -> AsyncIterator[str]:
+        """Server-sent events for ``job``, resuming after ``last_event_id``; ends once the job finishes."""
+        seen = max(0, last_event_id)
+        while True:
+            while seen < len(job.events):
+                event = job.events[seen]
+                seen += 1
+                yield f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+            if job.finished:
+                return
+            await job.wait_for_events(seen, keepalive)
+            if seen >= len(job.events) and not job.finished:
+                yield ": keepalive\n\n"
+
+    async def _work(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        job.status = "running"
+        try:
+            job.result = await self.runner(job)
+        except asyncio.CancelledError:
+            self._finish(job, "failed", error="Server shutting down")
+            raise
+        except ValueError as exc:
+            self._finish(job, "failed", error=str(exc))
+        except Exception as exc:  # noqa: BLE001 - surface any pipeline failure to the client
+            print(f"[jobs] Job {job.id} failed: {exc!r}")
+            self._finish(job, "failed", error="Pipeline failed; see server logs")
+        else:
+            self._finish(job, "completed")
+        finally:
+            job.payload = None  # release uploaded bytes as soon as the run is over
+
+    def _finish(self, job: Job, status: str, error: Optional[str] = None) -> None:
+        job.status = status
+        job.stage = status
+        job.error = error
+        job.finished_at = time.time()
+        if status == "completed":
+            job.publish("completed", job.result or {})
+        else:
+            job.publish("failed", {"detail": error})
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.retention_seconds
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished_at and job.finished_at < cutoff]:
+            del self._jobs[job_id]
@@ -1,77 +1,100 @@
 from __future__ import annotations
 
-import os
-from functools import lru_cache
-from typing import List, Literal, TypedDict
+import time
+from typing import Callable, List, Optional
 
-from dotenv import load_dotenv
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
-from tenacity import retry, stop_after_attempt, wait_exponential
+from tenacity import RetryCallState, retry, wait_exponential
 
 from backend.config import get_settings
+from backend.services.llm_providers import Message, ProviderResponse, Schema, get_provider
+from backend.services.llm_scheduler import estimate_tokens, get_scheduler, is_rate_limited, retry_after_seconds
+from backend.services.metrics import record_llm_attempt, record_llm_retry
 
-load_dotenv()
+_backoff = wait_exponential(multiplier=1, min=2, max=8)
 
-Role = Literal["system", "user", "assistant"]
 
+def _retry_wait(retry_state: RetryCallState) -> float:
+    exc = retry_state.outcome.exception() if retry_state.outcome else None
+    if exc is not None and is_rate_limited(exc):
+        return 0.0  # the scheduler's cool-down paces the retry for every caller at once
+    return _backoff(retry_state)
 
-class Message(TypedDict):
-    role: Role
-    content: str
 
+def _stop(retry_state: RetryCallState) -> bool:
+    return retry_state.attempt_number >= get_settings().llm_max_attempts
 
-@lru_cache(maxsize=1)
-def _get_llm() -> ChatGoogleGenerativeAI:
-    settings = get_settings()
-    return ChatGoogleGenerativeAI(
-        model=settings.gemini_model,
-        google_api_key=settings.google_api_key,
-        temperature=settings.gemini_temperature,
-        max_output_tokens=settings.gemini_max_output_tokens,
-        convert_system_message_to_human=True,
-    )
 
+def _before_retry(retry_state: RetryCallState) -> None:
+    record_llm_retry()
+
+
+async def _stream_response(
+    provider, messages: List[Message], schema: Schema, on_text: Callable[[str], None]
+) -> ProviderResponse:
+    """Collect a streamed response, passing the text received so far to ``on_text`` after each piece."""
+    received = ""
+    async for piece in provider.stream(messages, schema):
+        received += piece
+        on_text(received)
+    if not received.strip():
+        raise ValueError("LLM returned empty response")
+    return ProviderResponse(text=received.strip())
 
-def _to_langchain_messages(messages: List[Message]):
-    converted = []
-    for message in messages:
-        if message["role"] == "system":
-            converted.append(SystemMessage(content=message["content"]))
-        elif message["role"] == "user":
-            converted.append(HumanMessage(content=message["content"]))
-        else:
-            converted.append(AIMessage(content=message["content"]))
-    return converted
 
+def _usage_tokens(response: ProviderResponse, prompt_tokens: int) -> tuple[int, int, bool]:
+    """Provider-reported (input, output) tokens when available, otherwise the character estimate."""
+    if response.input_tokens is not None and response.output_tokens is not None:
+        return response.input_tokens, response.output_tokens, False
+    return prompt_tokens, estimate_tokens(response.text), True
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=8))
-def create_chat_completion(messages: List[Message], temperature: float = 0.0, max_tokens: int = 2048) -> str:
-    llm = _get_llm()
+
+@retry(stop=_stop, wait=_retry_wait, before_sleep=_before_retry)
+async def create_chat_completion(
+    messages: List[Message],
+    temperature: float = 0.0,
+    max_tokens: int = 2048,
+    on_text: Optional[Callable[[str], None]] = None,
+    response_schema: Schema = None,
+) -> str:
+    """Return the model's reply; with ``on_text`` the reply is streamed and each attempt's
+    text so far is reported as it grows (a retry starts again from an empty string).
+    ``response_schema`` requests structured JSON output that follows the schema."""
+    provider = get_provider()
+    scheduler = get_scheduler()
+    prompt_chars = sum(len(message["content"]) for message in messages)
+    prompt_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+    waited = await scheduler.acquire(prompt_tokens)
+    started = time.perf_counter()
     try:
-        response = llm.invoke(_to_langchain_messages(messages))
-        content = response.content
-        
-        if isinstance(content, str):
-            if not content.strip():
-                raise ValueError("LLM returned empty response")
-            return content.strip()
-        if isinstance(content, list):
-            text = "".join(part.get("text", "") for part in content if isinstance(part, dict))
-            if text:
-                return text.strip()
-            raise ValueError("LLM returned empty response")
-        
-        result = str(content)
-        if not result.strip():
-            raise ValueError("LLM returned empty response")
-        return result
+        if on_text is None:
+            response = await provider.complete(messages, response_schema)
+        else:
+            response = await _stream_response(provider, messages, response_schema, on_text)
     except IndexError as e:
+        record_llm_attempt(False, time.perf_counter() - started, waited)
         print(f"[llm_client] Gemini returned empty response (IndexError). Common causes:")
         print("  1. Input text exceeds model limits - reduce max_report_chars in config")
         print("  2. Content blocked by safety filters")
         print("  3. API quota/rate limit exceeded")
         raise ValueError("LLM returned empty response - input may be too large or filtered") from e
     except Exception as e:
+        record_llm_attempt(False, time.perf_counter() - started, waited)
+        if is_rate_limited(e):
+            scheduler.cool_down(retry_after_seconds(e))
         print(f"[llm_client] LLM invocation failed: {e}")
         raise
+
+    text = response.text
+    input_tokens, output_tokens, estimated = _usage_tokens(response, prompt_tokens)
+    scheduler.record_usage(prompt_tokens, input_tokens + output_tokens)
+    record_llm_attempt(
+        True,
+        time.perf_counter() - started,
+        waited,
+        prompt_chars=prompt_chars,
+        response_chars=len(text),
+        prompt_tokens=input_tokens,
+        response_tokens=output_tokens,
+        estimated=estimated,
+    )
+    return text
@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+_WHITESPACE = " \t\r\n"
+_SCALAR_END = ",}" + _WHITESPACE
+_TRAILING_COMMA_RE = re.compile(r",(\s*[}\]])")
+_DECODER = json.JSONDecoder(strict=False)  # tolerate raw newlines and tabs inside strings
+
+
+def object_schema(field_names: Iterable[str] | None = None) -> Dict[str, Any]:
+    """JSON schema for a flat object of string values; without names it only asks for a JSON object."""
+    if not field_names:
+        return {"type": "object"}
+    names = list(field_names)
+    return {
+        "type": "object",
+        "properties": {name: {"type": "string"} for name in names},
+        "required": names,
+    }
+
+
+def _strip_fences(text: str) -> str:
+    cleaned = text.strip()
+    if cleaned.startswith("```json"):
+        cleaned = cleaned.split("```json", 1)[1].split("```", 1)[0].strip()
+    elif cleaned.startswith("```"):
+        cleaned = cleaned.split("```", 1)[1].split("```", 1)[0].strip()
+    return cleaned
+
+
+def _loads_object(text: str) -> Optional[Dict[str, Any]]:
+    try:
+        value = _DECODER.decode(text)
+    except json.JSONDecodeError:
+        return None
+    return value if isinstance(value, dict) else None
+
+
+def parse_json_object(text: str, expected: Iterable[str] | None = None) -> Tuple[Dict[str, Any], bool]:
+    """Parse an LLM's JSON object answer, repairing it locally when it is malformed.
+
+    Returns the members and whether repair was needed. Markdown fences,
+    surrounding prose, trailing commas and raw control characters inside
+    strings are tolerated outright. A truncated or otherwise broken object
+    keeps every member that is complete; members named in ``expected`` are
+    also looked up individually, so one bad value does not lose the fields
+    after it. A number, boolean or null counts only once something follows
+    it, since the cut may have dropped its last digits. What cannot be
+    recovered is simply absent, so the caller can ask for just those fields
+    again.
+    """
+    cleaned = _strip_fences(text)
+    start = cleaned.find("{")
+    if start < 0:
+        return {}, True
+    cleaned = cleaned[start:]
+    end = cleaned.rfind("}")
+    if end >= 0:
+        body = cleaned[:end + 1]
+        for candidate in (body, _TRAILING_COMMA_RE.sub(r"\1", body)):
+            value = _loads_object(candidate)
+            if value is not None:
+                return value, False
+
+    members = dict(JSONObjectStream().feed(cleaned))
+    for name in expected or ():
+        if name in members:
+            continue
+        for match in re.finditer(re.escape(json.dumps(name)) + r"\s*:\s*", cleaned):
+            try:
+                value, end = _DECODER.raw_decode(cleaned, match.end())
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(value, (str, dict, list)) and cleaned[end:].lstrip(_WHITESPACE)[:1] not in (",", "}"):
+                continue  # a number at the cut may be missing digits ("12" of 1250)
+            members[name] = value
+            break
+    return members, True
+
+
+class JSONObjectStream:
+    """Incrementally parses a streamed top-level JSON object.
+
+    ``feed`` takes the response text received so far and returns the object's
+    members that became complete since the previous call, so a field can be
+    shown as soon as its closing quote (or bracket) arrives. Scanning resumes
+    where the last call stopped, which keeps a long response linear overall.
+    Text that does not extend the previous feed (a retried call starting over)
+    resets the parser. Anything before the opening brace, such as a markdown
+    fence, is skipped; malformed input simply stops further members.
+    """
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self._text = ""
+        self._pos = 0
+        self._state = "start"
+        self._key: str | None = None
+        self._token_start = 0
+        self._scan = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self.done = False
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        if not text.startswith(self._text):
+            self.reset()
+        self._text = text
+        members: List[Tuple[str, Any]] = []
+        while True:
+            step = getattr(self, f"_step_{self._state}")()
+            if step is None:
+                return members
+            if step is not True:
+                members.append(step)
+
+    # Each step returns None when it needs more input, True after advancing,
+    # or a completed (key, value) member.
+
+    def _skip_whitespace(self) -> bool:
+        text = self._text
+        while self._pos < len(text) and text[self._pos] in _WHITESPACE:
+            self._pos += 1
+        return self._pos < len(text)
+
+    def _step_start(self):
+        brace = self._text.find("{", self._pos)
+        if brace < 0:
+            self._pos = len(self._text)
+            return None
+        self._pos = brace + 1
+        self._state = "member"
+        return True
+
+    def _step_member(self):
+        text = self._text
+        while self._pos < len(text) and text[self._pos] in _WHITESPACE + ",":
+            self._pos += 1
+        if self._pos >= len(text):
+            return None
+        char = text[self._pos]
+        if char == "}":
+            self._pos += 1
+            self._state = "end"
+            self.done = True
+        elif char == '"':
+            self._begin_string("key")
+        else:
+            self._state = "end"
+        return True
+
+    def _step_key(self):
+        end = self._scan_string()
+        if end is None:
+            return None
+        try:
+            self._key = str(json.loads(self._text[self._token_start:end]))
+        except json.JSONDecodeError:
+            self._state = "end"
+            return True
+        self._pos = end
+        self._state = "colon"
+        return True
+
+    def _step_colon(self):
+        if not self._skip_whitespace():
+            return None
+        if self._text[self._pos] != ":":
+            self._state = "end"
+            return True
+        self._pos += 1
+        self._state = "value"
+        return True
+
+    def _step_value(self):
+        if not self._skip_whitespace():
+            return None
+        char = self._text[self._pos]
+        if char == '"':
+            self._begin_string("string")
+        elif char in "{[":
+            self._token_start = self._scan = self._pos
+            self._depth = 0
+            self._in_string = self._escape = False
+            self._state = "nested"
+        else:
+            self._token_start = self._scan = self._pos
+            self._state = "scalar"
+        return True
+
+    def _step_string(self):
+        end = self._scan_string()
+        return None if end is None else self._complete(end)
+
+    def _step_nested(self):
+        text = self._text
+        for index in range(self._scan, len(text)):
+            char = text[index]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    return self._complete(index + 1)
+        self._scan = len(text)
+        return None
+
+    def _step_scalar(self):
+        text = self._text
+        for index in range(self._scan, len(text)):
+            if text[index] in _SCALAR_END:
+                return self._complete(index)
+        self._scan = len(text)  # a number may still be growing
+        return None
+
+    def _step_end(self):
+        return None
+
+    def _begin_string(self, state: str) -> None:
+        self._token_start = self._pos
+        self._scan = self._pos + 1
+        self._escape = False
+        self._state = state
+
+    def _scan_string(self) -> int | None:
+        """Index just past the closing quote of the string at ``_token_start``, or None if it is still open."""
+        text = self._text
+        for index in range(self._scan, len(text)):
+            if self._escape:
+                self._escape = False
+            elif text[index] == "\\":
+                self._escape = True
+            elif text[index] == '"':
+                return index + 1
+        self._scan = len(text)
+        return None
+
+    def _complete(self, end: int):
+        try:
+            value = _DECODER.decode(self._text[self._token_start:end])
+        except json.JSONDecodeError:
+            self._state = "end"
+            return True
+        self._pos = end
+        self._state = "member"
+        return (self._key, value)
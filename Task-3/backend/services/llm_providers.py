@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import ast
+import asyncio
+import json
+import random
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional, Protocol, TypedDict
+
+from backend.config import Settings, get_settings
+from backend.services.cache import content_hash
+
+Role = Literal["system", "user", "assistant"]
+
+
+class Message(TypedDict):
+    role: Role
+    content: str
+
+
+@dataclass
+class ProviderResponse:
+    text: str
+    input_tokens: Optional[int] = None  # None when the provider does not report usage
+    output_tokens: Optional[int] = None
+
+
+# JSON schema the response must follow; providers with structured output enforce it.
+Schema = Optional[Dict[str, Any]]
+
+
+class LLMProvider(Protocol):
+    name: str
+
+    async def complete(self, messages: List[Message], schema: Schema = None) -> ProviderResponse:
+        ...
+
+    def stream(self, messages: List[Message], schema: Schema = None) -> AsyncIterator[str]:
+        """Yield the response text in pieces as the provider generates it."""
+        ...
+
+
+def _response_text(text: str) -> str:
+    if not text.strip():
+        raise ValueError("LLM returned empty response")
+    return text.strip()
+
+
+def _candidate_text(response) -> str:
+    """Text of the first candidate, or "" when Gemini returned none (e.g. blocked by safety filters)."""
+    candidates = getattr(response, "candidates", None) or []
+    if not candidates or candidates[0].content is None:
+        return ""
+    return "".join(getattr(part, "text", "") for part in candidates[0].content.parts)
+
+
+class GeminiProvider:
+    """Calls Gemini through ``google.generativeai`` with every client-side retry turned off.
+
+    LangChain's wrapper retried 429s and other API errors up to ten times
+    inside a single scheduler admission, and the generated client retries
+    503s on its own; here each request is one attempt, and only
+    ``create_chat_completion`` retries, through the scheduler.
+    """
+
+    name = "gemini"
+
+    def __init__(self, settings: Settings) -> None:
+        if not settings.google_api_key:
+            raise ValueError("GOOGLE_API_KEY is required when LLM_PROVIDER=gemini")
+        import google.generativeai as genai
+
+        genai.configure(api_key=settings.google_api_key)
+        self._model = genai.GenerativeModel(model_name=settings.gemini_model)
+        self._config: Dict[str, Any] = {
+            "temperature": settings.gemini_temperature,
+            "max_output_tokens": settings.gemini_max_output_tokens,
+        }
+
+    @staticmethod
+    def _to_contents(messages: List[Message]) -> List[Dict[str, Any]]:
+        """Gemini chat turns; system text is sent as the leading part of the next user turn."""
+        contents: List[Dict[str, Any]] = []
+        system: List[str] = []
+        for message in messages:
+            if message["role"] == "system":
+                system.append(message["content"])
+            elif message["role"] == "user":
+                contents.append({"role": "user", "parts": [*system, message["content"]]})
+                system = []
+            else:
+                contents.append({"role": "model", "parts": [message["content"]]})
+        return contents
+
+    def _request(self, messages: List[Message], schema: Schema, stream: bool):
+        config = dict(self._config)
+        if schema is not None:
+            config["response_mime_type"] = "application/json"
+            if schema.get("properties"):  # Gemini rejects object schemas without properties
+                config["response_schema"] = schema
+        return self._model.generate_content_async(
+            self._to_contents(messages), generation_config=config, stream=stream, request_options={"retry": None}
+        )
+
+    async def complete(self, messages: List[Message], schema: Schema = None) -> ProviderResponse:
+        response = await self._request(messages, schema, stream=False)
+        usage = getattr(response, "usage_metadata", None)
+        return ProviderResponse(
+            text=_response_text(_candidate_text(response)),
+            input_tokens=getattr(usage, "prompt_token_count", None) if usage else None,
+            output_tokens=getattr(usage, "candidates_token_count", None) if usage else None,
+        )
+
+    async def stream(self, messages: List[Message], schema: Schema = None) -> AsyncIterator[str]:
+        async for chunk in await self._request(messages, schema, stream=True):
+            text = _candidate_text(chunk)
+            if text:
+                yield text
+
+
+class LocalProviderError(RuntimeError):
+    code = 503
+
+
+class LocalProvider:
+    """Offline stand-in that answers the pipeline's prompts with schema-valid JSON.
+
+    Field detection returns the template's candidate fields; extraction (and
+    combined detection and extraction) returns every field, filled from a
+    ``Field: value`` line in the report when there is one. Latency, jitter and failures are drawn from a generator
+    seeded by the prompt and how often it has been asked, so a given sequence
+    of calls behaves the same on every run and a retried call can succeed.
+    A share of answers can be cut short to exercise JSON repair.
+    ``stream`` delivers the same answer in pieces spread over the call's latency.
+    """
+
+    name = "local"
+    model = "stand-in-1"  # Bump when the answers it gives change, so cached ones are not reused
+    stream_chunk_chars = 48
+    first_token_share = 0.2  # Share of the call's latency spent before the first streamed piece
+
+    def __init__(
+        self, latency: float, jitter: float, failure_rate: float, seed: int = 0, malformed_rate: float = 0.0
+    ) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.malformed_rate = malformed_rate
+        self.seed = seed
+        self._asked: Dict[str, int] = {}
+
+    def _rng(self, messages: List[Message]) -> random.Random:
+        key = content_hash(*(message["content"] for message in messages))
+        attempt = self._asked.get(key, 0)
+        self._asked[key] = attempt + 1
+        return random.Random(content_hash(str(self.seed), key, str(attempt)))
+
+    async def complete(self, messages: List[Message], schema: Schema = None) -> ProviderResponse:
+        rng = self._rng(messages)
+        await asyncio.sleep(max(0.0, self.latency + rng.uniform(-self.jitter, self.jitter)))
+        if rng.random() < self.failure_rate:
+            raise LocalProviderError("503 Service Unavailable (simulated by the local LLM provider)")
+        return ProviderResponse(text=self._answer(messages, rng))
+
+    async def stream(self, messages: List[Message], schema: Schema = None) -> AsyncIterator[str]:
+        rng = self._rng(messages)
+        latency = max(0.0, self.latency + rng.uniform(-self.jitter, self.jitter))
+        await asyncio.sleep(latency * self.first_token_share)
+        if rng.random() < self.failure_rate:
+            raise LocalProviderError("503 Service Unavailable (simulated by the local LLM provider)")
+        text = self._answer(messages, rng)
+        pieces = [text[i:i + self.stream_chunk_chars] for i in range(0, len(text), self.stream_chunk_chars)]
+        pause = latency * (1 - self.first_token_share) / max(1, len(pieces))
+        for index, piece in enumerate(pieces):
+            if index:
+                await asyncio.sleep(pause)
+            yield piece
+
+    def _answer(self, messages: List[Message], rng: random.Random) -> str:
+        text = json.dumps(self._respond(messages[-1]["content"]), indent=2)
+        if rng.random() < self.malformed_rate:
+            # Simulates output cut off at the token limit.
+            text = text[: rng.randint(1, max(1, len(text) - 1))]
+        return text
+
+    def _respond(self, prompt: str) -> Dict[str, Any]:
+        if "CANDIDATE FIELDS:" in prompt:
+            names = _detection_candidates(prompt)
+            if "REPORT TEXT" not in prompt:
+                return {name: "" for name in names}
+            # Combined detection and extraction: the report follows the template.
+            return {name: _find_value(_report_section(prompt), name) for name in names}
+        if "FIELDS TO FILL:" in prompt:
+            fields = _section_json(prompt, "FIELDS TO FILL:")
+            report = _report_section(prompt.split("FIELDS TO FILL:", 1)[0])
+            return {name: _find_value(report, name) for name in fields}
+        return {}
+
+
+def _detection_candidates(prompt: str) -> List[str]:
+    section = prompt.split("CANDIDATE FIELDS:", 1)[1].strip().split("\n\n", 1)[0]
+    try:
+        candidates = ast.literal_eval(section)
+    except (ValueError, SyntaxError):
+        return []
+    return [str(candidate) for candidate in candidates]
+
+
+def _report_section(prompt: str) -> str:
+    if "REPORT TEXT" not in prompt:
+        return prompt
+    # Skip the instructions (and their examples) before the report header.
+    return prompt.split("REPORT TEXT", 1)[1].partition("\n")[2]
+
+
+def _section_json(prompt: str, marker: str) -> Dict[str, Any]:
+    section = prompt.split(marker, 1)[1].lstrip()
+    try:
+        value, _ = json.JSONDecoder().raw_decode(section)
+    except json.JSONDecodeError:
+        return {}
+    return value if isinstance(value, dict) else {}
+
+
+def _find_value(report: str, field: str) -> str:
+    match = re.search(rf"{re.escape(field)}\s*:[ \t]*(.*)(?:\n(.*))?", report, re.I)
+    if not match:
+        return ""
+    return (match.group(1) or match.group(2) or "").strip()
+
+
+def model_identity(settings: Settings) -> str:
+    """Provider and model whose answers the caches hold, e.g. ``gemini:gemini-2.5-flash``.
+
+    Part of every LLM cache key, so the local stand-in's answers are never
+    served to a Gemini run and switching models starts with a cold cache.
+    """
+    if settings.llm_provider == "local":
+        return f"{LocalProvider.name}:{LocalProvider.model}"
+    return f"{GeminiProvider.name}:{settings.gemini_model}"
+
+
+@lru_cache(maxsize=1)
+def get_provider() -> LLMProvider:
+    settings = get_settings()
+    if settings.llm_provider == "local":
+        print("[llm_providers] Using the local stand-in LLM provider (no network calls)")
+        return LocalProvider(
+            latency=settings.local_llm_latency,
+            jitter=settings.local_llm_jitter,
+            failure_rate=settings.local_llm_failure_rate,
+            malformed_rate=settings.local_llm_malformed_rate,
+            seed=settings.local_llm_seed,
+        )
+    return GeminiProvider(settings)
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import asyncio
+import re
+import sys
+import time
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from backend.config import get_settings
+from backend.services.metrics import LLM_RATE_LIMITED
+
+CHARS_PER_TOKEN = 4  # Rough Gemini ratio; the API version in use does not report usage
+_RETRY_HINT_RE = re.compile(r"retry(?:_delay)?\D{0,20}?(\d+(?:\.\d+)?)\s*s", re.I)
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    """Whether ``exc``, or an exception it wraps, is an HTTP 429 from the provider.
+
+    Decided by type and status code only; an unrelated error whose message
+    happens to contain "429" (an ID, a page count) is not a rate limit.
+    """
+    # Only look up google-api-core if the Gemini client already imported it.
+    api_errors = sys.modules.get("google.api_core.exceptions")
+    seen = set()
+    error: Optional[BaseException] = exc
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if api_errors is not None and isinstance(error, api_errors.TooManyRequests):  # ResourceExhausted subclasses it
+            return True
+        if getattr(error, "code", None) == 429 or getattr(error, "status_code", None) == 429:
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """The server's retry hint in a rate-limit error ("retry in 7s", "retry_delay { seconds: 7 }")."""
+    match = _RETRY_HINT_RE.search(str(exc))
+    return float(match.group(1)) if match else None
+
+
+class TokenBucket:
+    """Refills continuously at ``per_minute / 60`` units per second up to ``per_minute``."""
+
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        amount = min(amount, self.capacity)  # an oversized request waits for a full bucket, not forever
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.level -= min(amount, self.capacity)
+
+    def give(self, amount: float) -> None:
+        self.level = min(self.capacity, self.level + amount)
+
+
+class LLMScheduler:
+    """Process-wide request and token budget shared by every LLM call.
+
+    Callers are admitted first come, first served once both buckets hold enough
+    budget, so concurrent claims and map-reduce chunks queue here instead of
+    bursting into the provider's rate limit. A 429 pauses all callers for the
+    server's retry hint, and retries go back through ``acquire`` so they spend
+    the same budget.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int, cooldown_seconds: float) -> None:
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.cooldown_seconds = cooldown_seconds
+        self._lock = asyncio.Lock()
+        self._paused_until = 0.0
+        self.calls = 0
+        self.rate_limited = 0
+        self.waiting = 0
+        self.wait_seconds = 0.0
+
+    async def acquire(self, tokens: int) -> float:
+        """Wait until one request and ``tokens`` estimated tokens fit the budget, spend them, and return the wait."""
+        self.waiting += 1
+        started = time.monotonic()
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    delay = self._paused_until - now
+                    if self.requests is not None:
+                        delay = max(delay, self.requests.wait_time(1, now))
+                    if self.tokens is not None:
+                        delay = max(delay, self.tokens.wait_time(tokens, now))
+                    if delay <= 0:
+                        break
+                    await asyncio.sleep(delay)
+                if self.requests is not None:
+                    self.requests.take(1)
+                if self.tokens is not None:
+                    self.tokens.take(tokens)
+                self.calls += 1
+        finally:
+            self.waiting -= 1
+            waited = time.monotonic() - started
+            self.wait_seconds += waited
+        return waited
+
+    def record_usage(self, reserved_tokens: int, used_tokens: int) -> None:
+        """Settle the estimate spent in ``acquire`` against the tokens the call actually used."""
+        if self.tokens is None:
+            return
+        if used_tokens > reserved_tokens:
+            self.tokens.take(used_tokens - reserved_tokens)
+        else:
+            self.tokens.give(reserved_tokens - used_tokens)
+
+    def cool_down(self, seconds: Optional[float] = None) -> None:
+        """Hold every caller back after the provider reported a rate limit."""
+        self.rate_limited += 1
+        LLM_RATE_LIMITED.inc()
+        pause = seconds if seconds is not None else self.cooldown_seconds
+        self._paused_until = max(self._paused_until, time.monotonic() + pause)
+        print(f"[llm_scheduler] Rate limited by provider; pausing LLM calls for {pause:.1f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "calls": self.calls,
+            "rate_limited": self.rate_limited,
+            "waiting": self.waiting,
+            "wait_seconds": round(self.wait_seconds, 3),
+            "paused_for": round(max(0.0, self._paused_until - now), 3),
+            "requests_available": None if self.requests is None else round(self.requests.level, 2),
+            "tokens_available": None if self.tokens is None else int(self.tokens.level),
+        }
+
+
+@lru_cache(maxsize=1)
+def get_scheduler() -> LLMScheduler:
+    settings = get_settings()
+    return LLMScheduler(
+        requests_per_minute=settings.llm_requests_per_minute,
+        tokens_per_minute=settings.llm_tokens_per_minute,
+        cooldown_seconds=settings.llm_rate_limit_cooldown,
+    )
@@ -0,0 +1,204 @@
+"""Prometheus metrics for the backend, plus per-run accounting.
+
+The process-wide counters, gauges and histograms behind ``/metrics`` come from
+``prometheus_client``. Every pipeline run also gets a ``RunMetrics`` that rides
+along in a context variable, so LLM calls and cache lookups made anywhere below
+``GLRPipeline.run`` (including concurrent map-reduce chunks and worker threads)
+are attributed to the run that issued them, too.
+"""
+
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, Optional
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, disable_created_metrics
+
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+TOKEN_BUCKETS = (100, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000)
+
+disable_created_metrics()  # no *_created series; nothing scraping /metrics uses them
+REGISTRY = CollectorRegistry()
+
+RUNS = Counter("glr_pipeline_runs_total", "Pipeline runs by outcome.", ("outcome",), registry=REGISTRY)
+RUN_LATENCY = Histogram(
+    "glr_pipeline_run_duration_seconds",
+    "Wall-clock time of a pipeline run, excluding PDF conversion.",
+    ("outcome",),
+    registry=REGISTRY,
+    buckets=LATENCY_BUCKETS,
+)
+RUNS_IN_FLIGHT = Gauge("glr_pipeline_runs_in_flight", "Runs waiting for or holding a run slot.", registry=REGISTRY)
+STAGE_LATENCY = Histogram(
+    "glr_stage_duration_seconds", "Wall-clock time of each pipeline stage.", ("stage",), registry=REGISTRY, buckets=LATENCY_BUCKETS
+)
+TIME_TO_FIRST_FIELD = Histogram(
+    "glr_time_to_first_field_seconds",
+    "Time from run start until the first extracted field reached a streaming client.",
+    registry=REGISTRY,
+    buckets=LATENCY_BUCKETS,
+)
+LLM_ATTEMPTS = Counter("glr_llm_attempts_total", "LLM call attempts by outcome.", ("outcome",), registry=REGISTRY)
+LLM_RETRIES = Counter("glr_llm_retries_total", "LLM attempts that were retried.", registry=REGISTRY)
+LLM_LATENCY = Histogram(
+    "glr_llm_call_duration_seconds", "Provider latency of each LLM attempt.", ("outcome",), registry=REGISTRY, buckets=LATENCY_BUCKETS
+)
+LLM_SCHEDULER_WAIT = Histogram(
+    "glr_llm_scheduler_wait_seconds", "Time each LLM attempt waited for rate budget.", registry=REGISTRY, buckets=LATENCY_BUCKETS
+)
+LLM_TOKENS = Histogram(
+    "glr_llm_tokens",
+    "Tokens per successful LLM call (estimated when the provider reports none).",
+    ("kind",),
+    registry=REGISTRY,
+    buckets=TOKEN_BUCKETS,
+)
+LLM_CHARS = Counter("glr_llm_chars_total", "Characters sent to and received from the LLM.", ("kind",), registry=REGISTRY)
+LLM_RATE_LIMITED = Counter("glr_llm_rate_limited_total", "Rate-limit (429) responses from the provider.", registry=REGISTRY)
+LLM_JSON_REPAIRS = Counter(
+    "glr_llm_json_repairs_total",
+    "Malformed, truncated or incomplete JSON answers completed locally instead of retried in full.",
+    registry=REGISTRY,
+)
+LLM_REREQUESTED_FIELDS = Counter(
+    "glr_llm_rerequested_fields_total", "Fields asked for again because a repaired answer lacked them.", registry=REGISTRY
+)
+LLM_WAITING = Gauge("glr_llm_scheduler_waiting", "LLM calls waiting for rate budget.", registry=REGISTRY)
+ARTIFACT_BYTES = Gauge("glr_artifact_store_bytes", "Bytes held by stored run outputs after the last collection.", registry=REGISTRY)
+ARTIFACT_DEDUPLICATED = Counter(
+    "glr_artifact_deduplicated_total", "Run outputs whose bytes were already stored.", ("kind",), registry=REGISTRY
+)
+ARTIFACT_GC_DELETED = Counter(
+    "glr_artifact_gc_deleted_total", "Runs, blobs and stray files deleted by garbage collection.", ("kind",), registry=REGISTRY
+)
+QUEUE_DEPTH = Gauge("glr_queue_depth", "Submissions waiting in a background queue.", ("queue",), registry=REGISTRY)
+CACHE_LOOKUPS = Counter("glr_cache_lookups_total", "Cache lookups by cache and result.", ("cache", "result"), registry=REGISTRY)
+
+
+@dataclass
+class RunMetrics:
+    """Timings, LLM usage and cache results collected for one pipeline run."""
+
+    started: float = field(default_factory=time.perf_counter)
+    timings: Dict[str, float] = field(default_factory=dict)
+    llm: Dict[str, Any] = field(
+        default_factory=lambda: {
+            "calls": 0,
+            "attempts": 0,
+            "retries": 0,
+            "failures": 0,
+            "prompt_chars": 0,
+            "response_chars": 0,
+            "prompt_tokens": 0,
+            "response_tokens": 0,
+            "tokens_estimated": False,
+            "json_repairs": 0,
+            "rerequested_fields": 0,
+            "llm_seconds": 0.0,
+            "scheduler_wait_seconds": 0.0,
+        }
+    )
+    cache: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+    def add_timing(self, name: str, seconds: float) -> None:
+        self.timings[name] = round(self.timings.get(name, 0.0) + seconds, 4)
+        STAGE_LATENCY.labels(stage=name).observe(seconds)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_timing(name, time.perf_counter() - started)
+
+    def as_dict(self) -> Dict[str, Any]:
+        llm = dict(self.llm)
+        llm["llm_seconds"] = round(llm["llm_seconds"], 4)
+        llm["scheduler_wait_seconds"] = round(llm["scheduler_wait_seconds"], 4)
+        timings = dict(self.timings)
+        timings["total"] = round(time.perf_counter() - self.started, 4)
+        return {"timings": timings, "llm": llm, "cache": {name: dict(counts) for name, counts in self.cache.items()}}
+
+
+_current_run: ContextVar[Optional[RunMetrics]] = ContextVar("glr_run_metrics", default=None)
+
+
+@contextmanager
+def track_run(run: RunMetrics) -> Iterator[RunMetrics]:
+    """Attribute LLM calls and cache lookups made inside the block to ``run``."""
+    token = _current_run.set(run)
+    try:
+        yield run
+    finally:
+        _current_run.reset(token)
+
+
+def current_run() -> Optional[RunMetrics]:
+    return _current_run.get()
+
+
+def record_llm_attempt(
+    ok: bool,
+    seconds: float,
+    wait_seconds: float,
+    prompt_chars: int = 0,
+    response_chars: int = 0,
+    prompt_tokens: int = 0,
+    response_tokens: int = 0,
+    estimated: bool = True,
+) -> None:
+    outcome = "ok" if ok else "error"
+    LLM_ATTEMPTS.labels(outcome=outcome).inc()
+    LLM_LATENCY.labels(outcome=outcome).observe(seconds)
+    LLM_SCHEDULER_WAIT.observe(wait_seconds)
+    if ok:
+        LLM_CHARS.labels(kind="prompt").inc(prompt_chars)
+        LLM_CHARS.labels(kind="response").inc(response_chars)
+        LLM_TOKENS.labels(kind="prompt").observe(prompt_tokens)
+        LLM_TOKENS.labels(kind="response").observe(response_tokens)
+
+    run = current_run()
+    if run is None:
+        return
+    llm = run.llm
+    llm["attempts"] += 1
+    llm["llm_seconds"] += seconds
+    llm["scheduler_wait_seconds"] += wait_seconds
+    if not ok:
+        llm["failures"] += 1
+        return
+    llm["calls"] += 1
+    llm["prompt_chars"] += prompt_chars
+    llm["response_chars"] += response_chars
+    llm["prompt_tokens"] += prompt_tokens
+    llm["response_tokens"] += response_tokens
+    llm["tokens_estimated"] = llm["tokens_estimated"] or estimated
+
+
+def record_llm_retry() -> None:
+    LLM_RETRIES.inc()
+    run = current_run()
+    if run is not None:
+        run.llm["retries"] += 1
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_LOOKUPS.labels(cache=cache, result="hit" if hit else "miss").inc()
+    run = current_run()
+    if run is not None:
+        counts = run.cache.setdefault(cache, {"hits": 0, "misses": 0})
+        counts["hits" if hit else "misses"] += 1
+
+
+def record_json_repair(rerequested_fields: int) -> None:
+    """A malformed answer was repaired locally and ``rerequested_fields`` it lacked are being asked for again."""
+    LLM_JSON_REPAIRS.inc()
+    LLM_REREQUESTED_FIELDS.inc(rerequested_fields)
+    run = current_run()
+    if run is not None:
+        run.llm["json_repairs"] += 1
+        run.llm["rerequested_fields"] += rerequested_fields
@@ -0,0 +1,348 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+PDF_PENDING = "pending"
+PDF_READY = "ready"
+PDF_UNAVAILABLE = "unavailable"
+
+# docx2pdf drives Microsoft Word, which it can only script on Windows and macOS.
+_DOCX2PDF_PLATFORMS = ("win32", "darwin")
+
+
+def _load_uno():
+    try:
+        import uno  # type: ignore
+        from com.sun.star.beans import PropertyValue  # type: ignore
+    except ImportError:
+        return None
+    return uno, PropertyValue
+
+
+class _OfficeSlot:
+    """One warm headless LibreOffice with its own user profile.
+
+    The process stays up between conversions. With the ``uno`` bridge available
+    documents are converted over its named pipe; without it each conversion is a
+    ``soffice --convert-to`` call on the same profile, which LibreOffice hands to
+    the running process instead of starting a new office, so it still skips the
+    cold start.
+    """
+
+    def __init__(self, index: int, soffice: str) -> None:
+        self.index = index
+        self.soffice = soffice
+        self.profile_dir: Optional[Path] = None  # set by PdfConversionService.start
+        self.pipe_name = f"glr_soffice_{os.getpid()}_{index}"
+        self.process: Optional[subprocess.Popen] = None
+        self.client: Optional[subprocess.Popen] = None
+        self.desktop = None
+        self.restarts = 0
+        self._uno = _load_uno()
+
+    @property
+    def profile_url(self) -> str:
+        return self.profile_dir.resolve().as_uri()
+
+    @property
+    def uses_uno(self) -> bool:
+        return self._uno is not None
+
+    def start(self) -> None:
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        self.process = subprocess.Popen(
+            [
+                self.soffice,
+                "--headless",
+                "--invisible",
+                "--nologo",
+                "--nodefault",
+                "--norestore",
+                "--nolockcheck",
+                f"-env:UserInstallation={self.profile_url}",
+                f"--accept=pipe,name={self.pipe_name};urp;StarOffice.ComponentContext",
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        if self.uses_uno:
+            self.desktop = self._connect(timeout=30.0)
+
+    def _connect(self, timeout: float):
+        uno, _ = self._uno
+        local = uno.getComponentContext()
+        resolver = local.ServiceManager.createInstanceWithContext("com.sun.star.bridge.UnoUrlResolver", local)
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                context = resolver.resolve(f"uno:pipe,name={self.pipe_name};urp;StarOffice.ComponentContext")
+                return context.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", context)
+            except Exception:  # noqa: BLE001 - NoConnectException until soffice has started
+                if self.process is not None and self.process.poll() is not None:
+                    raise RuntimeError(f"soffice exited with status {self.process.returncode} during start-up")
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.25)
+
+    def healthy(self) -> bool:
+        if self.process is None or self.process.poll() is not None:
+            return False
+        if not self.uses_uno:
+            return True
+        if self.desktop is None:
+            return False
+        try:
+            self.desktop.getComponents()
+        except Exception:  # noqa: BLE001 - any bridge error means the process is unusable
+            return False
+        return True
+
+    def stop(self) -> None:
+        if self.desktop is not None:
+            try:
+                self.desktop.terminate()
+            except Exception:  # noqa: BLE001 - the process may already be gone
+                pass
+        elif self.process is not None and self.process.poll() is None:
+            self.process.terminate()  # no bridge to ask the office to quit
+        self.desktop = None
+        if self.process is not None:
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.process = None
+
+    def kill(self) -> None:
+        for process in (self.client, self.process):
+            if process is not None and process.poll() is None:
+                process.kill()
+
+    def restart(self) -> None:
+        self.restarts += 1
+        print(f"[pdf_conversion] Restarting LibreOffice slot {self.index}")
+        self.kill()
+        self.stop()
+        self.start()
+
+    def convert(self, docx_path: Path, pdf_path: Path, timeout: float) -> None:
+        if not self.healthy():
+            self.restart()
+        if self.uses_uno:
+            self._convert_uno(docx_path, pdf_path)
+        else:
+            self._convert_cli(docx_path, pdf_path, timeout)
+
+    def _convert_uno(self, docx_path: Path, pdf_path: Path) -> None:
+        uno, PropertyValue = self._uno
+
+        def prop(name, value):
+            item = PropertyValue()
+            item.Name = name
+            item.Value = value
+            return item
+
+        document = self.desktop.loadComponentFromURL(
+            uno.systemPathToFileUrl(str(docx_path.resolve())), "_blank", 0, (prop("Hidden", True),)
+        )
+        if document is None:
+            raise RuntimeError(f"LibreOffice could not open {docx_path.name}")
+        try:
+            document.storeToURL(
+                uno.systemPathToFileUrl(str(pdf_path.resolve())), (prop("FilterName", "writer_pdf_Export"),)
+            )
+        finally:
+            document.close(True)
+
+    def _convert_cli(self, docx_path: Path, pdf_path: Path, timeout: float) -> None:
+        with tempfile.TemporaryDirectory(prefix="glr_pdf_") as outdir:
+            self.client = subprocess.Popen(
+                [
+                    self.soffice,
+                    "--headless",
+                    "--norestore",
+                    f"-env:UserInstallation={self.profile_url}",
+                    "--convert-to",
+                    "pdf",
+                    "--outdir",
+                    outdir,
+                    str(docx_path),
+                ],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+            )
+            try:
+                _, stderr = self.client.communicate(timeout=timeout)
+            finally:
+                if self.client.poll() is None:
+                    self.client.kill()
+                    self.client.wait()
+                returncode, self.client = self.client.returncode, None
+            if returncode != 0:
+                raise RuntimeError(f"soffice exited with status {returncode}: {stderr.decode(errors='replace')[-300:]}")
+            produced = Path(outdir) / docx_path.with_suffix(".pdf").name
+            if not produced.exists():
+                raise RuntimeError("LibreOffice did not produce a PDF")
+            shutil.move(str(produced), pdf_path)
+
+
+class PdfConversionService:
+    """Pool of LibreOffice slots that converts DOCX to PDF in the background.
+
+    ``submit`` returns immediately; callers await the returned task (or poll
+    ``status``) to learn when the PDF link becomes usable. Slot profiles live in
+    a directory created by ``start`` for this process and removed by ``stop``.
+    """
+
+    _MAX_TRACKED_RUNS = 10000
+
+    def __init__(self, workers: int, timeout: float, soffice: str, profile_root: Path, health_interval: float) -> None:
+        self.timeout = timeout
+        self.soffice = shutil.which(soffice) or soffice
+        self.health_interval = health_interval
+        self.profile_root = profile_root
+        self._profile_dir: Optional[Path] = None
+        self._slots: List[_OfficeSlot] = [_OfficeSlot(i, self.soffice) for i in range(max(1, workers))]
+        self._idle: Optional[asyncio.Queue[_OfficeSlot]] = None
+        self._status: Dict[str, str] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._health_task: Optional[asyncio.Task] = None
+        self.available = sys.platform in _DOCX2PDF_PLATFORMS or shutil.which(soffice) is not None
+
+    async def start(self) -> None:
+        """Launch and connect every slot so the first conversion does not pay LibreOffice start-up."""
+        if self._idle is not None:
+            return
+        self._idle = asyncio.Queue()
+        if not self.available:
+            print("[pdf_conversion] LibreOffice not found; PDF export disabled (install LibreOffice for PDFs)")
+            return
+        self.profile_root.mkdir(parents=True, exist_ok=True)
+        self._profile_dir = Path(tempfile.mkdtemp(prefix="glr_soffice_", dir=self.profile_root))
+        for slot in self._slots:
+            slot.profile_dir = self._profile_dir / f"slot_{slot.index}"
+            try:
+                await asyncio.to_thread(slot.start)
+            except Exception as exc:  # noqa: BLE001 - a slot that fails to boot is retried on first use
+                print(f"[pdf_conversion] Slot {slot.index} failed to start: {exc}")
+            self._idle.put_nowait(slot)
+        mode = "UNO" if self._slots[0].uses_uno else "CLI"
+        print(f"[pdf_conversion] {len(self._slots)} warm LibreOffice slots ready ({mode} conversion)")
+        if self.health_interval > 0:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def stop(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+        for task in list(self._tasks.values()):
+            task.cancel()
+        for slot in self._slots:
+            await asyncio.to_thread(slot.stop)
+        self._idle = None
+        if self._profile_dir is not None:
+            await asyncio.to_thread(shutil.rmtree, self._profile_dir, True)
+            self._profile_dir = None
+
+    def status(self, run_id: str) -> Optional[str]:
+        return self._status.get(run_id)
+
+    def submit(
+        self, run_id: str, docx_path: Path, pdf_path: Path, on_done: Optional[Callable[[bool, float], None]] = None
+    ) -> asyncio.Task:
+        self._status[run_id] = PDF_PENDING if self.available else PDF_UNAVAILABLE
+        while len(self._status) > self._MAX_TRACKED_RUNS:
+            self._status.pop(next(iter(self._status)))  # older runs fall back to checking the disk
+        task = asyncio.create_task(self._convert(run_id, docx_path, pdf_path, on_done))
+        self._tasks[run_id] = task
+        return task
+
+    async def wait(self, run_id: str) -> Optional[str]:
+        task = self._tasks.get(run_id)
+        if task is not None:
+            await asyncio.shield(task)
+        return self.status(run_id)
+
+    async def _convert(
+        self, run_id: str, docx_path: Path, pdf_path: Path, on_done: Optional[Callable[[bool, float], None]]
+    ) -> bool:
+        started = time.perf_counter()
+        converted = False
+        try:
+            converted = await self.convert(docx_path, pdf_path)
+        finally:
+            # on_done runs first so the PDF is stored before the run reports it ready. It
+            # hashes and moves the PDF and rewrites files, so it runs in a worker thread.
+            if on_done is not None:
+                try:
+                    await asyncio.to_thread(on_done, converted, time.perf_counter() - started)
+                except Exception as exc:  # noqa: BLE001 - the status below must still be set
+                    print(f"[pdf_conversion] Completion hook failed for {run_id}: {exc}")
+                    converted = False
+            self._status[run_id] = PDF_READY if converted else PDF_UNAVAILABLE
+            self._tasks.pop(run_id, None)
+            if converted:
+                print(f"[pdf_conversion] PDF ready for {run_id} in {time.perf_counter() - started:.2f}s")
+        return converted
+
+    async def convert(self, docx_path: Path, pdf_path: Path) -> bool:
+        if sys.platform in _DOCX2PDF_PLATFORMS:
+            try:
+                from docx2pdf import convert
+                await asyncio.to_thread(convert, str(docx_path), str(pdf_path))
+                return True
+            except Exception as e:
+                print(f"[pdf_conversion] docx2pdf failed: {e}")
+
+        if not self.available:
+            return False
+        if self._idle is None:
+            await self.start()
+
+        idle = self._idle
+        slot = await idle.get()
+        worker = asyncio.ensure_future(asyncio.to_thread(slot.convert, docx_path, pdf_path, self.timeout))
+        # The slot goes back to the pool only once its worker thread has returned,
+        # so a timed-out conversion can never overlap the next one on that slot.
+        worker.add_done_callback(lambda done: self._release(idle, slot, done))
+        try:
+            await asyncio.wait_for(asyncio.shield(worker), timeout=self.timeout)
+            return pdf_path.exists()
+        except asyncio.TimeoutError:
+            print(f"[pdf_conversion] Conversion timed out after {self.timeout}s on slot {slot.index}")
+            slot.kill()  # unblocks the worker thread; the slot restarts on its next use
+            return False
+        except Exception as exc:  # noqa: BLE001 - report and keep the DOCX-only result
+            print(f"[pdf_conversion] Conversion failed on slot {slot.index}: {exc}")
+            return False
+
+    @staticmethod
+    def _release(idle: asyncio.Queue[_OfficeSlot], slot: _OfficeSlot, worker: asyncio.Future) -> None:
+        if not worker.cancelled():
+            worker.exception()  # the caller reports failures; one that outlived its timeout is dropped here
+        idle.put_nowait(slot)
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval)
+            idle = self._idle
+            if idle is None:
+                return
+            # Only check slots that are idle right now; busy ones are checked before use.
+            for _ in range(idle.qsize()):
+                slot = idle.get_nowait()
+                try:
+                    if not await asyncio.to_thread(slot.healthy):
+                        await asyncio.to_thread(slot.restart)
+                except Exception as exc:  # noqa: BLE001
+                    print(f"[pdf_conversion] Health check restart failed for slot {slot.index}: {exc}")
+                finally:
+                    idle.put_nowait(slot)
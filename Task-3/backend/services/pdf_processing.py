@@ -1,18 +1,149 @@
 from __future__ import annotations
 
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from io import BytesIO
-from typing import Iterable
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional
 
-import fitz  # type: ignore
+from backend.config import get_settings
 
+REPORT_SEPARATOR = "\n--- End of Report {number} ---\n"
 
-def extract_text_from_pdfs(pdf_streams: Iterable[bytes]) -> str:
-    combined_text: list[str] = []
-    for index, content in enumerate(pdf_streams):
-        if not content:
-            continue
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+class PageText(NamedTuple):
+    report: int  # 1-based, matches the "End of Report N" separator
+    page: int  # 0-based page index within the report
+    text: str
+
+
+def _worker_count() -> int:
+    configured = get_settings().pdf_workers
+    return configured if configured > 0 else (os.cpu_count() or 1)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn avoids forking a process that already runs the event loop and thread pools
+            _pool = ProcessPoolExecutor(max_workers=_worker_count(), mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def shutdown_pdf_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _page_count(content: bytes) -> int:
+    import fitz  # type: ignore  # PyMuPDF is loaded on first use to keep start-up fast
+
+    with fitz.open(stream=BytesIO(content), filetype="pdf") as doc:
+        return doc.page_count
+
+
+def _page_texts(path: str, start: int, stop: int) -> List[str]:
+    import fitz  # type: ignore
+
+    with fitz.open(path) as doc:
+        return [doc[index].get_text() for index in range(start, stop)]
+
+
+def _iter_serial(reports: List[tuple[int, bytes]]) -> Iterator[PageText]:
+    import fitz  # type: ignore
+
+    for number, content in reports:
         with fitz.open(stream=BytesIO(content), filetype="pdf") as doc:
-            for page in doc:
-                combined_text.append(page.get_text())
-        combined_text.append(f"\n--- End of Report {index + 1} ---\n")
+            for index, page in enumerate(doc):
+                yield PageText(number, index, page.get_text())
+
+
+def _iter_parallel(reports: List[tuple[int, bytes, int]], workers: int) -> Iterator[PageText]:
+    total_pages = sum(pages for _, _, pages in reports)
+    pages_per_task = max(4, -(-total_pages // (workers * 2)))
+    pool = _get_pool()
+
+    # Each report is written to disk once and workers open it by path; pickling
+    # the bytes into every page-range task would copy a photo-heavy PDF per task.
+    # Submit everything up front; results are consumed in submission order so page
+    # order is preserved while later chunks keep extracting in the background.
+    tasks: List[tuple[int, int, Future]] = []
+    with tempfile.TemporaryDirectory(prefix="glr_pdf_", ignore_cleanup_errors=True) as spool:
+        try:
+            for number, content, pages in reports:
+                path = os.path.join(spool, f"report_{number}.pdf")
+                with open(path, "wb") as handle:
+                    handle.write(content)
+                for start in range(0, pages, pages_per_task):
+                    stop = min(start + pages_per_task, pages)
+                    tasks.append((number, start, pool.submit(_page_texts, path, start, stop)))
+            for number, start, future in tasks:
+                for offset, text in enumerate(future.result()):
+                    yield PageText(number, start + offset, text)
+        finally:
+            for _, _, future in tasks:
+                future.cancel()
+
+
+def iter_pdf_pages(pdf_streams: Iterable[bytes]) -> Iterator[PageText]:
+    """Yield page text in report/page order as soon as each page is available.
+
+    Large claims fan pages out across a process pool; small ones stay in-process
+    where pool overhead would outweigh the gain. Empty payloads are skipped but
+    keep their report number.
+    """
+    reports = [(index + 1, content) for index, content in enumerate(pdf_streams) if content]
+    workers = _worker_count()
+    if workers <= 1 or not reports:
+        yield from _iter_serial(reports)
+        return
+
+    counted = [(number, content, _page_count(content)) for number, content in reports]
+    if sum(pages for _, _, pages in counted) < get_settings().pdf_parallel_min_pages:
+        yield from _iter_serial(reports)
+        return
+
+    emitted = 0
+    try:
+        for page in _iter_parallel(counted, workers):
+            emitted += 1
+            yield page
+    except BrokenProcessPool:
+        print("[pdf_processing] Process pool failed; finishing extraction in-process")
+        shutdown_pdf_pool()
+        remaining = _iter_serial(reports)
+        for _ in range(emitted):
+            next(remaining)
+        yield from remaining
+
+
+def extract_text_from_pdfs(
+    pdf_streams: Iterable[bytes], on_page: Optional[Callable[[PageText], None]] = None
+) -> str:
+    """Join every report's page text, calling ``on_page`` as each page arrives from ``iter_pdf_pages``."""
+    payloads = list(pdf_streams)
+    report_numbers = [index + 1 for index, content in enumerate(payloads) if content]
+    combined_text: list[str] = []
+    pending = iter(report_numbers)
+    current = next(pending, None)
+    for page in iter_pdf_pages(payloads):
+        if on_page is not None:
+            on_page(page)
+        while current is not None and current < page.report:
+            combined_text.append(REPORT_SEPARATOR.format(number=current))
+            current = next(pending, None)
+        combined_text.append(page.text)
+    while current is not None:
+        combined_text.append(REPORT_SEPARATOR.format(number=current))
+        current = next(pending, None)
     return "\n".join(combined_text).strip()
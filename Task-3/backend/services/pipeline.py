@@ -1,16 +1,151 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import os
+import tempfile
+import threading
+import time
 import uuid
-import subprocess
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Callable, Dict, List
 
-from backend.config import DIAGNOSTICS_DIR, OUTPUT_DIR, get_settings
+from backend.config import CACHE_DIR, DIAGNOSTICS_DIR, OUTPUT_DIR, get_settings
+from backend.services.artifacts import ArtifactStore
+from backend.services.cache import JSONCache, content_hash
 from backend.services.llm_client import create_chat_completion
-from backend.services.pdf_processing import extract_text_from_pdfs
-from backend.services.template_logic import detect_fields_with_llm, fill_template
+from backend.services.llm_providers import model_identity
+from backend.services.llm_json import JSONObjectStream, object_schema, parse_json_object
+from backend.services.metrics import (
+    RUN_LATENCY,
+    RUNS,
+    RUNS_IN_FLIGHT,
+    STAGE_LATENCY,
+    TIME_TO_FIRST_FIELD,
+    RunMetrics,
+    record_cache,
+    record_json_repair,
+    track_run,
+)
+from backend.services.pdf_conversion import PDF_PENDING, PDF_READY, PDF_UNAVAILABLE, PdfConversionService
+from backend.services.pdf_processing import PageText, extract_text_from_pdfs
+from backend.services.retrieval import BM25Index, render_passages, select_passages
+from backend.services.template_logic import (
+    CompiledTemplate,
+    compile_template,
+    detect_fields_with_llm,
+    fill_template,
+    template_fields_cache_key,
+)
+from backend.services.text_chunks import TextChunk, merge_partial_values, split_text
+
+
+# Receives a stage name and JSON-serialisable details as the run advances.
+ProgressCallback = Callable[[str, Dict[str, Any]], None]
+# Receives a field name and its extracted value as soon as the value is known.
+FieldCallback = Callable[[str, Any], None]
+
+EXTRACTION_SYSTEM_PROMPT = "You are a precise data extraction assistant. Extract complete, verbatim information from insurance documents into JSON format. Never summarize or truncate - copy all details exactly as written."
+COMBINED_SYSTEM_PROMPT = "You identify the fields of insurance report templates and fill them with complete, verbatim information from insurance documents, returning JSON. Never summarize or truncate - copy all details exactly as written."
+
+EXTRACTION_RULES = """1. Extract COMPLETE information - don't summarize or truncate
+2. Copy multi-line descriptions EXACTLY as written, preserving ALL details
+3. For dates like "Date of Loss: 9/28/2024", extract "9/28/2024"
+4. For descriptive fields (e.g., "Dwelling Description", "Roof Description"), extract the ENTIRE description verbatim
+5. Include ALL measurements, materials, observations, and technical details
+6. If field says "N/A" or "None", copy that exact text
+7. Leave empty ("") only if truly missing from the report
+8. Preserve original formatting, punctuation, and paragraph structure
+9. Do NOT paraphrase or shorten any text - copy it word-for-word"""
+
+
+def _no_progress(stage: str, details: Dict[str, Any]) -> None:
+    pass
+
+
+def _field_streamer(on_field: FieldCallback | None, allowed: Dict[str, Any] | None = None):
+    """``on_text`` hook that reports each completed member of a streamed JSON object, or None to not stream."""
+    if on_field is None or not get_settings().stream_extraction:
+        return None
+    parser = JSONObjectStream()
+
+    def on_text(text: str) -> None:
+        for name, value in parser.feed(text):
+            if allowed is None or name in allowed:
+                on_field(name, value)
+
+    return on_text
+
+
+def _normalise_label(label: str) -> str:
+    return " ".join(label.replace("{", " ").replace("}", " ").rstrip(": ").split()).casefold()
+
+
+def _validate_combined(values: Any, candidates: List[str]) -> str | None:
+    """Why a combined detection-and-extraction answer cannot be used, or None when it can."""
+    if not isinstance(values, dict) or not values:
+        return "expected a non-empty JSON object"
+    for name, value in values.items():
+        if not name.strip() or len(name) > 200:
+            return f"implausible field name {name[:60]!r}"
+        if isinstance(value, (dict, list)):
+            return f"field {name[:60]!r} has a nested value"
+    if candidates:
+        known = {_normalise_label(candidate) for candidate in candidates}
+        if not any(_normalise_label(name) in known for name in values):
+            return "no field matches the template's candidate labels"
+    return None
+
+
+def _scalar_text(value: Any) -> str:
+    """A validated combined answer's value as template text; the combined call's schema does not force strings."""
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+def _record_pdf_outcome(
+    artifacts: ArtifactStore, run_id: str, diagnostics_path: Path, staged_pdf: Path, converted: bool, seconds: float
+) -> None:
+    STAGE_LATENCY.labels(stage="pdf_conversion").observe(seconds)
+    pdf = None
+    store_error = None
+    if converted:
+        try:
+            pdf = artifacts.put_file(run_id, "pdf", staged_pdf, ".pdf")
+        except OSError as exc:
+            store_error = exc
+            converted = False
+    try:
+        diagnostics = json.loads(diagnostics_path.read_text(encoding="utf-8"))
+        diagnostics["pdf_path"] = str(pdf.path) if pdf is not None else None
+        diagnostics["pdf_sha256"] = pdf.sha256 if pdf is not None else None
+        diagnostics["pdf_status"] = PDF_READY if converted else PDF_UNAVAILABLE
+        diagnostics.setdefault("timings", {})["pdf_conversion"] = round(seconds, 4)
+        # Written aside and swapped in, so a reader of the diagnostics URL never sees half a file.
+        tmp_path = diagnostics_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps(diagnostics, indent=2), encoding="utf-8")
+        os.replace(tmp_path, diagnostics_path)
+    except (OSError, json.JSONDecodeError) as exc:
+        print(f"[pipeline] Could not record PDF outcome in {diagnostics_path.name}: {exc}")
+    if store_error is not None:
+        raise store_error  # the converter then reports the PDF unavailable
+
+
+@dataclass
+class ExtractionResult:
+    values: Dict[str, str]
+    mode: str
+    calls: int
+    cache_hits: int
+    provenance: Dict[str, List[int]] = field(default_factory=dict)
+    chunks: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def cached(self) -> bool:
+        return self.calls > 0 and self.cache_hits == self.calls
 
 
 @dataclass
@@ -26,132 +161,552 @@ class PipelineResult:
 class GLRPipeline:
     def __init__(self) -> None:
         self.settings = get_settings()
+        # Bounds how many claims run at once; PDF parsing, filling and soffice all
+        # run off the event loop, so this mostly caps memory and LLM fan-out.
+        self._run_slots = asyncio.Semaphore(self.settings.max_concurrent_runs)
+        self.converter = PdfConversionService(
+            workers=self.settings.pdf_converter_workers,
+            timeout=self.settings.pdf_conversion_timeout,
+            soffice=self.settings.soffice_path,
+            profile_root=Path(tempfile.gettempdir()) / "glr_soffice_profiles",
+            health_interval=self.settings.pdf_converter_health_interval,
+        )
+        self.field_cache = JSONCache(
+            "template_fields",
+            max_entries=self.settings.field_cache_size,
+            directory=CACHE_DIR / "template_fields" if self.settings.field_cache_persist else None,
+        )
+        self.extraction_cache = JSONCache(
+            "extraction",
+            max_entries=self.settings.extraction_cache_size,
+            directory=CACHE_DIR / "extraction" if self.settings.extraction_cache_persist else None,
+            ttl_seconds=self.settings.extraction_cache_ttl_seconds,
+            max_disk_entries=self.settings.extraction_cache_max_disk_entries,
+        )
+        self.artifacts = ArtifactStore(
+            OUTPUT_DIR,
+            ttl_seconds=self.settings.artifact_ttl_seconds,
+            max_bytes=self.settings.artifact_max_bytes,
+            gc_interval=self.settings.artifact_gc_interval,
+        )
+        # Field detections in progress, by template SHA-256; concurrent runs of a
+        # template that is not cached yet wait for the first one's answer.
+        self._detections: Dict[str, asyncio.Future] = {}
 
-    def _extract_data_with_llm(self, report_text: str, fields_to_fill: Dict[str, str]) -> Dict[str, str]:
-        # Truncate report text to avoid overwhelming the model
-        truncated_text = report_text[:self.settings.max_report_chars]
-        if len(report_text) > self.settings.max_report_chars:
-            print(f"[pipeline] Report truncated from {len(report_text)} to {self.settings.max_report_chars} chars")
-        
-        prompt = f"""Extract information from this insurance report and fill the JSON template with complete, detailed information.
+    async def _cached_fields(self, template: CompiledTemplate) -> Dict[str, str] | None:
+        cached = await self.field_cache.aget(template_fields_cache_key(template.sha256, model_identity(self.settings)))
+        record_cache("template_fields", bool(cached))
+        if not cached:
+            return None
+        print(f"[pipeline] Template field map cache hit ({template.sha256[:12]})")
+        return dict(cached)
 
-CRITICAL EXTRACTION RULES:
-1. Extract COMPLETE information - don't summarize or truncate
-2. Copy multi-line descriptions EXACTLY as written, preserving ALL details
-3. For dates like "Date of Loss: 9/28/2024", extract "9/28/2024"
-4. For descriptive fields (e.g., "Dwelling Description", "Roof Description"), extract the ENTIRE description verbatim
-5. Include ALL measurements, materials, observations, and technical details
-6. If field says "N/A" or "None", copy that exact text
-7. Leave empty ("") only if truly missing from the report
-8. Preserve original formatting, punctuation, and paragraph structure
-9. Do NOT paraphrase or shorten any text - copy it word-for-word
+    async def _detect_fields(self, template: CompiledTemplate) -> Dict[str, str]:
+        fields, repaired = await detect_fields_with_llm(template)
+        # A repaired map is padded with heuristic candidates; caching it would pin
+        # that guess for the template, so the next run asks again instead.
+        if fields and not repaired:
+            await self.field_cache.aset(template_fields_cache_key(template.sha256, model_identity(self.settings)), fields)
+        return fields
+
+    def invalidate_field_cache(self, template_sha256: str | None = None) -> int:
+        if template_sha256 is None:
+            return self.field_cache.invalidate()
+        return self.field_cache.invalidate(template_fields_cache_key(template_sha256, model_identity(self.settings)))
+
+    def _build_extraction_prompt(
+        self, report_text: str, fields_to_fill: Dict[str, str], excerpt: str | None = None
+    ) -> str:
+        if excerpt is None:
+            report_header = f"REPORT TEXT ({len(report_text)} chars):"
+            excerpt_note = ""
+        else:
+            report_header = f"REPORT TEXT ({excerpt}, {len(report_text)} chars):"
+            excerpt_note = "\nThis is one excerpt of a longer report. Leave a field empty (\"\") if this excerpt does not contain it.\n"
 
-REPORT TEXT ({len(truncated_text)} chars):
-{truncated_text}
+        return f"""Extract information from this insurance report and fill the JSON template with complete, detailed information.
 
+CRITICAL EXTRACTION RULES:
+{EXTRACTION_RULES}
+
+{report_header}
+{report_text}
+{excerpt_note}
 FIELDS TO FILL:
 {json.dumps(fields_to_fill, indent=2)}
 
 Return ONLY the filled JSON with complete extracted values, no markdown or commentary.
 Include ALL available details from the report."""
 
-        response = create_chat_completion(
+    def _extraction_cache_key(self, report_text: str, fields_to_fill: Dict[str, str], prompt: str) -> str:
+        return content_hash(
+            "extraction",
+            report_text,
+            json.dumps(fields_to_fill, sort_keys=True),
+            model_identity(self.settings),
+            repr(self.settings.gemini_temperature),
+            EXTRACTION_SYSTEM_PROMPT,
+            prompt,
+        )
+
+    async def _extract_values(
+        self,
+        report_text: str,
+        fields_to_fill: Dict[str, str],
+        excerpt: str | None = None,
+        on_field: FieldCallback | None = None,
+    ) -> tuple[Dict[str, str], bool]:
+        """Extract ``fields_to_fill`` from ``report_text``; returns the values and whether they came from cache.
+
+        With ``on_field`` the response is streamed and each requested field is
+        reported as soon as its value has been generated. Fields that even the
+        repair round could not recover are left empty, and such a result is
+        not cached.
+        """
+        prompt = self._build_extraction_prompt(report_text, fields_to_fill, excerpt)
+        cache_key = self._extraction_cache_key(report_text, fields_to_fill, prompt)
+        cached = await self.extraction_cache.aget(cache_key)
+        record_cache("extraction", cached is not None)
+        if cached is not None:
+            print(f"[pipeline] Extraction cache hit ({cache_key[:12]})")
+            return dict(cached), True
+
+        values = await self._request_values(
+            report_text, fields_to_fill, excerpt, on_field, self.settings.llm_json_repair_rounds, prompt
+        )
+        if not values:
+            raise ValueError("LLM failed to return valid JSON for report extraction")
+        missing = [name for name in fields_to_fill if name not in values]
+        if missing:
+            print(f"[pipeline] Leaving {len(missing)} unrecovered fields empty: {missing[:5]}")
+            values.update(dict.fromkeys(missing, ""))
+        else:
+            await self.extraction_cache.aset(cache_key, values)
+        return values, False
+
+    async def _request_values(
+        self,
+        report_text: str,
+        fields_to_fill: Dict[str, str],
+        excerpt: str | None,
+        on_field: FieldCallback | None,
+        repair_rounds: int,
+        prompt: str | None = None,
+    ) -> Dict[str, Any]:
+        """One schema-constrained extraction call, plus follow-ups for fields its answer lacked.
+
+        A malformed or truncated answer is repaired locally rather than retried
+        in full; only the fields it is missing are asked for again, for up to
+        ``repair_rounds`` further calls. The result may still lack fields.
+        """
+        if prompt is None:
+            prompt = self._build_extraction_prompt(report_text, fields_to_fill, excerpt)
+        response = await create_chat_completion(
             messages=[
-                {"role": "system", "content": "You are a precise data extraction assistant. Extract complete, verbatim information from insurance documents into JSON format. Never summarize or truncate - copy all details exactly as written."},
+                {"role": "system", "content": EXTRACTION_SYSTEM_PROMPT},
                 {"role": "user", "content": prompt},
+            ],
+            on_text=_field_streamer(on_field, fields_to_fill),
+            response_schema=object_schema(fields_to_fill),
+        )
+        values, repaired = parse_json_object(response, fields_to_fill)
+        missing = {name: hint for name, hint in fields_to_fill.items() if name not in values}
+        if not repaired and not missing:
+            return values
+
+        retry_missing = bool(missing) and repair_rounds > 0
+        record_json_repair(len(missing) if retry_missing else 0)
+        print(
+            f"[pipeline] Extraction answer {'repaired' if repaired else 'incomplete'}: "
+            f"{len(fields_to_fill) - len(missing)} of {len(fields_to_fill)} fields recovered"
+        )
+        if retry_missing:
+            values.update(await self._request_values(report_text, missing, excerpt, on_field, repair_rounds - 1))
+        return values
+
+    def _resolve_mode(self, report_text: str) -> str:
+        mode = self.settings.extraction_mode
+        if mode == "auto":
+            mode = "map_reduce" if len(report_text) > self.settings.max_report_chars else "truncate"
+        return mode
+
+    def _build_combined_prompt(self, template: CompiledTemplate, report_text: str) -> str:
+        return f"""Identify every field in this insurance report template, then fill each one with complete, detailed information from the report below.
+
+TEMPLATE TEXT:
+{template.text[:self.settings.max_report_chars]}
+
+CANDIDATE FIELDS:
+{sorted(template.candidates)}
+
+Field names are the template's labels or placeholders (the candidates above are a heuristic guess; add or drop names as the template text requires).
+
+CRITICAL EXTRACTION RULES:
+{EXTRACTION_RULES}
+
+REPORT TEXT ({len(report_text)} chars):
+{report_text}
+
+Return ONLY one JSON object whose keys are the template's field names and whose values are the extracted values, no markdown or commentary."""
+
+    async def _detect_and_extract(
+        self, template: CompiledTemplate, report_text: str, on_field: FieldCallback | None = None
+    ) -> tuple[Dict[str, str], ExtractionResult] | None:
+        """Detect a first-seen template's fields and extract their values in one LLM call.
+
+        Returns the field map and extraction, or None when the answer does not
+        validate and the caller should fall back to detection followed by extraction.
+        Both results are cached as if the two-step flow had produced them, unless
+        the answer had to be repaired. The answer is not streamed: ``on_field``
+        hears its values only once it has been accepted, since a rejected one is
+        thrown away.
+        """
+        truncated_text = report_text[:self.settings.max_report_chars]
+        response = await create_chat_completion(
+            messages=[
+                {"role": "system", "content": COMBINED_SYSTEM_PROMPT},
+                {"role": "user", "content": self._build_combined_prompt(template, truncated_text)},
+            ],
+            response_schema=object_schema(),
+        )
+        candidates = sorted(template.candidates)
+        values, repaired = parse_json_object(response, candidates)
+        problem = _validate_combined(values, candidates)
+        if problem is not None:
+            print(f"[pipeline] Combined detection and extraction rejected ({problem}); falling back to two calls")
+            return None
+
+        values = {name: _scalar_text(value) for name, value in values.items()}
+        if on_field is not None:
+            for name, value in values.items():
+                on_field(name, value)
+        fields = {name: "" for name in values}
+        calls, cache_hits = 1, 0
+        if repaired:
+            # Candidates a cut-off answer never reached still belong to the template; ask for just those.
+            missing = {name: "" for name in candidates if name not in values}
+            record_json_repair(len(missing))
+            print(f"[pipeline] Combined answer repaired; requesting {len(missing)} missing fields")
+            if missing:
+                fields.update(missing)
+                extra, cached = await self._extract_values(truncated_text, missing, on_field=on_field)
+                values.update(extra)
+                calls += 1
+                cache_hits += int(cached)
+        else:
+            # Like a repaired detection, a field map completed from the candidates is not cached.
+            await self.field_cache.aset(template_fields_cache_key(template.sha256, model_identity(self.settings)), fields)
+            prompt = self._build_extraction_prompt(truncated_text, fields)
+            await self.extraction_cache.aset(self._extraction_cache_key(truncated_text, fields, prompt), values)
+        return fields, ExtractionResult(values=values, mode="combined", calls=calls, cache_hits=cache_hits)
+
+    async def _extract_data_with_llm(
+        self, report_text: str, fields_to_fill: Dict[str, str], on_field: FieldCallback | None = None
+    ) -> ExtractionResult:
+        """Extract every field's value; ``on_field`` hears about values that are already final.
+
+        Map-reduce chunk values are only partial until merged, so that mode reports nothing early.
+        """
+        mode = self._resolve_mode(report_text)
+        if mode == "map_reduce":
+            return await self._extract_map_reduce(report_text, fields_to_fill)
+        if mode == "retrieval":
+            return await self._extract_with_retrieval(report_text, fields_to_fill, on_field)
+
+        # Truncate report text to avoid overwhelming the model
+        truncated_text = report_text[:self.settings.max_report_chars]
+        if len(report_text) > self.settings.max_report_chars:
+            print(f"[pipeline] Report truncated from {len(report_text)} to {self.settings.max_report_chars} chars")
+        values, cached = await self._extract_values(truncated_text, fields_to_fill, on_field=on_field)
+        return ExtractionResult(values=values, mode="truncate", calls=1, cache_hits=int(cached))
+
+    async def _extract_map_reduce(self, report_text: str, fields_to_fill: Dict[str, str]) -> ExtractionResult:
+        """Extract from overlapping chunks concurrently and merge the partial results.
+
+        Chunks grow beyond ``max_report_chars`` only when the report would otherwise
+        need more than ``max_report_chunks`` calls.
+        """
+        chunk_chars = max(self.settings.max_report_chars, -(-len(report_text) // self.settings.max_report_chunks))
+        chunks = split_text(report_text, chunk_chars, self.settings.chunk_overlap_chars)
+        print(f"[pipeline] Map-reduce extraction over {len(chunks)} chunks of <= {chunk_chars} chars")
+
+        call_slots = asyncio.Semaphore(self.settings.max_concurrent_chunk_calls)
+
+        async def extract_chunk(chunk: TextChunk) -> tuple[Dict[str, str], bool] | None:
+            async with call_slots:
+                try:
+                    return await self._extract_values(
+                        chunk.text, fields_to_fill, f"excerpt {chunk.index + 1} of {len(chunks)}"
+                    )
+                except ValueError as exc:
+                    # One unusable answer only loses its own chunk; the others still fill the fields.
+                    print(f"[pipeline] Chunk {chunk.index + 1} of {len(chunks)} returned no values: {exc}")
+                    return None
+
+        results = await asyncio.gather(*(extract_chunk(chunk) for chunk in chunks))
+        partials = [result or ({}, False) for result in results]
+        if all(result is None for result in results):
+            raise ValueError("LLM failed to return valid JSON for report extraction")
+        values, provenance = merge_partial_values(fields_to_fill, [values for values, _ in partials])
+        return ExtractionResult(
+            values=values,
+            mode="map_reduce",
+            calls=len(chunks),
+            cache_hits=sum(1 for _, cached in partials if cached),
+            provenance=provenance,
+            chunks=[{"index": chunk.index, "start": chunk.start, "end": chunk.end} for chunk in chunks],
+        )
+
+    async def _extract_with_retrieval(
+        self, report_text: str, fields_to_fill: Dict[str, str], on_field: FieldCallback | None = None
+    ) -> ExtractionResult:
+        """Send each group of fields only the BM25-ranked passages relevant to it.
+
+        Fields still empty afterwards get one more call over a wider passage
+        selection, so retrieval misses fall back to more context rather than vanish.
+        """
+        settings = self.settings
+        index = await asyncio.to_thread(BM25Index.from_text, report_text, settings.retrieval_passage_chars)
+        names = list(fields_to_fill)
+        groups = [names[i:i + settings.retrieval_group_size] for i in range(0, len(names), settings.retrieval_group_size)]
+        call_slots = asyncio.Semaphore(settings.max_concurrent_chunk_calls)
+
+        def on_found(name: str, value: Any) -> None:
+            # An empty value may still be filled by the fallback round.
+            if str(value or "").strip():
+                on_field(name, value)
+
+        async def extract_group(
+            group: List[str], top_k: int, char_budget: int
+        ) -> tuple[List[str], List[int], str, Dict[str, str], bool]:
+            selected = select_passages(index, group, top_k, settings.retrieval_per_field_k, char_budget)
+            context = render_passages(index, selected)
+            async with call_slots:
+                values, cached = await self._extract_values(
+                    context,
+                    {name: fields_to_fill[name] for name in group},
+                    "selected passages",
+                    on_found if on_field is not None else None,
+                )
+            return group, selected, context, values, cached
+
+        group_chars = min(settings.retrieval_group_chars, settings.max_report_chars)
+        rounds = await asyncio.gather(
+            *(extract_group(group, settings.retrieval_top_k, group_chars) for group in groups)
+        )
+        if settings.retrieval_fallback:
+            missing = [
+                name for group, _, _, values, _ in rounds for name in group if not str(values.get(name) or "").strip()
             ]
+            if missing:
+                print(f"[pipeline] Retrieval left {len(missing)} fields empty; retrying with wider context")
+                rounds.append(
+                    await extract_group(
+                        missing, settings.retrieval_top_k * 3, min(group_chars * 3, settings.max_report_chars)
+                    )
+                )
+
+        values: Dict[str, str] = {name: "" for name in names}
+        provenance: Dict[str, List[int]] = {name: [] for name in names}
+        for group, selected, _, group_values, _ in rounds:
+            for name in group:
+                value = group_values.get(name)
+                if value is not None and str(value).strip():
+                    values[name] = value
+                    provenance[name] = selected
+            for name, value in group_values.items():
+                if name not in values:
+                    values[name] = value
+
+        context_chars = sum(len(context) for _, _, context, _, _ in rounds)
+        print(f"[pipeline] Retrieval extraction sent {context_chars} of {len(report_text)} report chars over {len(rounds)} calls")
+        return ExtractionResult(
+            values=values,
+            mode="retrieval",
+            calls=len(rounds),
+            cache_hits=sum(1 for *_, cached in rounds if cached),
+            provenance=provenance,
+            chunks=[
+                {"fields": group, "passages": selected, "context_chars": len(context)}
+                for group, selected, context, _, _ in rounds
+            ],
         )
-        try:
-            cleaned = response.strip()
-            if cleaned.startswith("```json"):
-                cleaned = cleaned.split("```json", 1)[1].split("```", 1)[0].strip()
-            elif cleaned.startswith("```"):
-                cleaned = cleaned.split("```", 1)[1].split("```", 1)[0].strip()
-            return json.loads(cleaned)
-        except json.JSONDecodeError as exc:
-            print(f"[pipeline] Failed to parse LLM response as JSON: {response[:500]}")
-            raise ValueError("LLM failed to return valid JSON for report extraction") from exc
-
-    def run(self, template_bytes: bytes, pdf_payloads: List[bytes]) -> PipelineResult:
+
+    async def run(
+        self,
+        template_bytes: bytes,
+        pdf_payloads: List[bytes],
+        progress: ProgressCallback | None = None,
+        on_field: FieldCallback | None = None,
+    ) -> PipelineResult:
         if not template_bytes:
             raise ValueError("Template file is empty")
         if not pdf_payloads:
             raise ValueError("At least one PDF report is required")
 
-        report_text = extract_text_from_pdfs(pdf_payloads)
+        run_metrics = RunMetrics()
+        outcome = "error"
+        RUNS_IN_FLIGHT.inc()
+        try:
+            with track_run(run_metrics):
+                async with self._run_slots:
+                    run_metrics.add_timing("queued", time.perf_counter() - run_metrics.started)
+                    result = await self._run(template_bytes, pdf_payloads, progress or _no_progress, on_field, run_metrics)
+            outcome = "ok"
+            return result
+        finally:
+            RUNS_IN_FLIGHT.dec()
+            RUNS.labels(outcome=outcome).inc()
+            RUN_LATENCY.labels(outcome=outcome).observe(time.perf_counter() - run_metrics.started)
+
+    async def _run(
+        self,
+        template_bytes: bytes,
+        pdf_payloads: List[bytes],
+        progress: ProgressCallback,
+        on_field: FieldCallback | None,
+        run_metrics: RunMetrics,
+    ) -> PipelineResult:
+        progress("extracting", {"reports": len(pdf_payloads)})
+        loop = asyncio.get_running_loop()
+        on_page = None
+        if progress is not _no_progress:
+            def on_page(page: PageText) -> None:  # called from the extraction thread
+                loop.call_soon_threadsafe(progress, "extracting", {"report": page.report, "page": page.page + 1})
+
+        async def read_reports() -> str:
+            with run_metrics.stage("pdf_extraction"):
+                return await asyncio.to_thread(extract_text_from_pdfs, pdf_payloads, on_page)
+
+        async def compile_once() -> CompiledTemplate:
+            # Parsed and indexed once; detection and filling both reuse it.
+            with run_metrics.stage("template_compile"):
+                return await asyncio.to_thread(compile_template, template_bytes)
+
+        # The template does not depend on the reports, so it compiles while pages are still being read.
+        report_text, template = await asyncio.gather(read_reports(), compile_once())
         if not report_text:
             raise ValueError("Could not extract any text from the provided PDF reports")
 
-        fields = detect_fields_with_llm(template_bytes)
+        progress("detecting_fields", {"report_chars": len(report_text)})
+        template_sha256 = template.sha256
+        fields = await self._cached_fields(template)
+        fields_cached = fields is not None
+
+        sent: Dict[str, Any] = {}
+
+        def report_field(name: str, value: Any) -> None:
+            # Retries re-stream fields already sent; only new or changed values go out.
+            if name in sent and sent[name] == value:
+                return
+            if not sent:
+                first_field = time.perf_counter() - run_metrics.started
+                run_metrics.timings["first_field"] = round(first_field, 4)
+                TIME_TO_FIRST_FIELD.observe(first_field)
+            sent[name] = value
+            on_field(name, value)
+
+        # Only stream LLM responses when someone is listening for fields.
+        field_listener = report_field if on_field is not None else None
+        extraction: ExtractionResult | None = None
+        pending = self._detections.get(template_sha256) if fields is None else None
+        if pending is not None:
+            print(f"[pipeline] Waiting for the field detection already running for {template_sha256[:12]}")
+            with run_metrics.stage("field_detection"):
+                shared = await asyncio.shield(pending)
+            fields = dict(shared) if shared else None
+        detection: asyncio.Future | None = None
+        if fields is None:
+            detection = self._detections[template_sha256] = asyncio.get_running_loop().create_future()
+        try:
+            if fields is None and self.settings.combined_extraction and self._resolve_mode(report_text) == "truncate":
+                # A first-seen template that fits one prompt with its report: detect and extract together.
+                progress("detecting_and_extracting", {"report_chars": len(report_text)})
+                with run_metrics.stage("combined_extraction"):
+                    detected = await self._detect_and_extract(template, report_text, field_listener)
+                if detected is not None:
+                    fields, extraction = detected
+            if fields is None:
+                with run_metrics.stage("field_detection"):
+                    fields = await self._detect_fields(template)
+        finally:
+            if detection is not None:
+                if self._detections.get(template_sha256) is detection:
+                    del self._detections[template_sha256]
+                # Runs that waited detect for themselves if this one failed.
+                detection.set_result(dict(fields) if fields else None)
         if not fields:
             raise ValueError("No fields detected inside the template")
 
-        filled_values = self._extract_data_with_llm(report_text, fields)
-        filled_doc_bytes = fill_template(template_bytes, filled_values)
+        if extraction is None:
+            progress("extracting_values", {"fields": len(fields), "cached_fields": fields_cached})
+            with run_metrics.stage("value_extraction"):
+                extraction = await self._extract_data_with_llm(report_text, fields, field_listener)
+        filled_values = extraction.values
+        if field_listener is not None:
+            for name, value in filled_values.items():
+                field_listener(name, value)
+        progress("filling", {"mode": extraction.mode, "llm_calls": extraction.calls})
+        with run_metrics.stage("template_fill"):
+            filled_doc_bytes = await asyncio.to_thread(fill_template, template, filled_values)
 
         unique_id = uuid.uuid4().hex
-        output_docx_path = OUTPUT_DIR / f"filled_template_{unique_id}.docx"
-        output_pdf_path = OUTPUT_DIR / f"filled_template_{unique_id}.pdf"
+        staged_pdf_path = self.artifacts.staging_path(unique_id, ".pdf")
         diagnostics_path = DIAGNOSTICS_DIR / f"pipeline_run_{unique_id}.json"
 
-        # Save DOCX
-        output_docx_path.write_bytes(filled_doc_bytes)
+        # Save DOCX; identical output from an earlier run is stored once.
+        with run_metrics.stage("docx_write"):
+            docx_artifact = await asyncio.to_thread(
+                self.artifacts.put_bytes, unique_id, "docx", filled_doc_bytes, ".docx"
+            )
 
-        # Try to convert to PDF
-        pdf_generated = False
-        try:
-            # Try docx2pdf (Windows only, requires Word)
-            from docx2pdf import convert
-            convert(str(output_docx_path), str(output_pdf_path))
-            pdf_generated = True
-            print(f"[pipeline] PDF generated using docx2pdf: {output_pdf_path}")
-        except Exception as e:
-            print(f"[pipeline] docx2pdf failed: {e}")
-            # Try LibreOffice as fallback
-            try:
-                subprocess.run(
-                    [
-                        "soffice",
-                        "--headless",
-                        "--convert-to",
-                        "pdf",
-                        "--outdir",
-                        str(OUTPUT_DIR),
-                        str(output_docx_path),
-                    ],
-                    check=True,
-                    capture_output=True,
-                    timeout=30,
-                )
-                temp_pdf = output_docx_path.with_suffix(".pdf")
-                if temp_pdf.exists():
-                    if temp_pdf != output_pdf_path:
-                        temp_pdf.rename(output_pdf_path)
-                    pdf_generated = True
-                    print(f"[pipeline] PDF generated using LibreOffice: {output_pdf_path}")
-            except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired) as e2:
-                print(f"[pipeline] Warning: Could not convert to PDF (neither Word nor LibreOffice available)")
-                print("[pipeline] Install Microsoft Word or LibreOffice for PDF export")
-
-        diagnostics_path.write_text(
-            json.dumps(
-                {
-                    "fields": fields,
-                    "filled_values": filled_values,
-                    "report_excerpt": report_text[:5000],
-                    "docx_path": str(output_docx_path),
-                    "pdf_path": str(output_pdf_path) if pdf_generated else None,
+        diagnostics = json.dumps(
+            {
+                "template_sha256": template_sha256,
+                "fields": fields,
+                "filled_values": filled_values,
+                "report_excerpt": report_text[:5000],
+                "docx_path": str(docx_artifact.path),
+                "docx_sha256": docx_artifact.sha256,
+                "pdf_path": None,
+                "pdf_status": PDF_PENDING,
+                "cache_hits": {"template_fields": fields_cached, "extraction": extraction.cached},
+                "extraction": {
+                    "mode": extraction.mode,
+                    "llm_calls": extraction.calls,
+                    "cached_calls": extraction.cache_hits,
+                    "chunks": extraction.chunks,
+                    "provenance": extraction.provenance,
                 },
-                indent=2,
+                # Timings in seconds; token counts are estimated when the provider reports none.
+                **run_metrics.as_dict(),
+            },
+            indent=2,
+        )
+        await asyncio.to_thread(diagnostics_path.write_text, diagnostics, encoding="utf-8")
+        await asyncio.to_thread(self.artifacts.attach, unique_id, "diagnostics", diagnostics_path)
+
+        # PDF conversion runs in the background pool; the DOCX result is returned now.
+        progress("converting", {"run_id": unique_id})
+        self.converter.submit(
+            unique_id,
+            docx_artifact.path,
+            staged_pdf_path,
+            on_done=lambda converted, seconds: _record_pdf_outcome(
+                self.artifacts, unique_id, diagnostics_path, staged_pdf_path, converted, seconds
             ),
-            encoding="utf-8",
         )
 
         return PipelineResult(
             run_id=unique_id,
-            download_path=output_docx_path,
+            download_path=docx_artifact.path,
             diagnostics_path=diagnostics_path,
             extracted_fields=fields,
             filled_values=filled_values,
             report_excerpt=report_text[:4000],
         )
+
+
+@lru_cache(maxsize=1)
+def get_pipeline() -> GLRPipeline:
+    return GLRPipeline()
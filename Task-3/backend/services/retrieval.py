@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Sequence
+
+from backend.services.text_chunks import TextChunk, split_text
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it of on or the this to was were with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in _STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over report passages, built once per run."""
+
+    def __init__(self, passages: Sequence[TextChunk], k1: float = 1.5, b: float = 0.75) -> None:
+        self.passages = list(passages)
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, List[tuple[int, int]]] = defaultdict(list)
+        self._lengths: List[int] = []
+        for index, passage in enumerate(self.passages):
+            counts = Counter(tokenize(passage.text))
+            self._lengths.append(sum(counts.values()))
+            for term, frequency in counts.items():
+                self._postings[term].append((index, frequency))
+        self._average_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+
+    @classmethod
+    def from_text(cls, report_text: str, passage_chars: int) -> "BM25Index":
+        return cls(split_text(report_text, passage_chars))
+
+    def _idf(self, term: str) -> float:
+        document_frequency = len(self._postings.get(term, ()))
+        total = len(self.passages)
+        return math.log(1 + (total - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def scores(self, query: str) -> Dict[int, float]:
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf(term)
+            for index, frequency in postings:
+                norm = 1 - self.b + self.b * self._lengths[index] / (self._average_length or 1.0)
+                scores[index] += idf * frequency * (self.k1 + 1) / (frequency + self.k1 * norm)
+        return scores
+
+    def search(self, query: str, top_k: int) -> List[int]:
+        """Indices of the ``top_k`` best passages for ``query``, best first (ties by position)."""
+        ranked = sorted(self.scores(query).items(), key=lambda item: (-item[1], item[0]))
+        return [index for index, _ in ranked[:top_k]]
+
+
+def select_passages(
+    index: BM25Index,
+    fields: Iterable[str],
+    top_k: int,
+    per_field_k: int,
+    char_budget: int,
+    anchor_passages: int = 1,
+) -> List[int]:
+    """Pick passages for a group of fields, returned in document order.
+
+    Combines the best passages for the whole group with the best few for each field
+    individually, so a field with rare terms is not crowded out, and always keeps the
+    first ``anchor_passages`` (claim header: insured, claim and policy numbers, dates).
+    """
+    field_list = list(fields)
+    chosen: List[int] = list(range(min(anchor_passages, len(index.passages))))
+    candidates = index.search(" ".join(field_list), top_k)
+    for field in field_list:
+        candidates.extend(index.search(field, per_field_k))
+
+    used = sum(len(index.passages[i].text) for i in chosen)
+    for candidate in candidates:
+        if candidate in chosen:
+            continue
+        size = len(index.passages[candidate].text)
+        if used + size > char_budget:
+            continue
+        chosen.append(candidate)
+        used += size
+    return sorted(chosen)
+
+
+def render_passages(index: BM25Index, selected: Sequence[int]) -> str:
+    parts: List[str] = []
+    previous = None
+    for position in selected:
+        if previous is not None and position != previous + 1:
+            parts.append("[...]")
+        parts.append(index.passages[position].text.strip())
+        previous = position
+    return "\n".join(parts)
@@ -1,66 +1,258 @@
 from __future__ import annotations
 
+import asyncio
+import copy
+import hashlib
 import io
-import json
-from typing import Dict, Set
-
-import docx
+import re
+import zipfile
+from collections import defaultdict
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Iterable, List, Set, Tuple
 
 from backend.config import get_settings
+from backend.services.cache import JSONCache, content_hash
 from backend.services.llm_client import create_chat_completion
+from backend.services.llm_json import object_schema, parse_json_object
+from backend.services.metrics import record_cache
+
+if TYPE_CHECKING:
+    import docx
+
+# Bump whenever the detection prompt changes so cached field maps are not reused.
+FIELD_PROMPT_VERSION = "1"
+
+
+def template_fields_cache_key(template_sha256: str, model: str) -> str:
+    return content_hash("template-fields", template_sha256, model, FIELD_PROMPT_VERSION)
 
 
 def _load_document(template_bytes: bytes) -> docx.Document:
+    import docx  # python-docx is loaded on first use to keep start-up fast
+
     return docx.Document(io.BytesIO(template_bytes))
 
 
-def extract_template_text(template_bytes: bytes) -> str:
-    document = _load_document(template_bytes)
-    parts: list[str] = []
-    for paragraph in document.paragraphs:
-        if paragraph.text.strip():
-            parts.append(paragraph.text)
-    for table in document.tables:
-        for row in table.rows:
-            cells = [cell.text.strip() for cell in row.cells if cell.text.strip()]
-            if cells:
-                parts.append(" | ".join(cells))
-    return "\n".join(parts)
-
-
-def _heuristic_field_candidates(template_bytes: bytes) -> Set[str]:
-    doc = _load_document(template_bytes)
-    candidates: Set[str] = set()
-
-    def add_candidate(text: str) -> None:
-        cleaned = text.strip().strip(":")
-        if 1 < len(cleaned) <= 80:
-            candidates.add(cleaned)
-
-    for paragraph in doc.paragraphs:
-        text = paragraph.text.strip()
-        if "{{" in text and "}}" in text:
-            for chunk in text.split("{{"):
-                if "}}" in chunk:
-                    add_candidate(chunk.split("}}", 1)[0])
-        elif ":" in text:
-            add_candidate(text.split(":", 1)[0])
-
-    for table in doc.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                cell_text = cell.text.strip()
-                if not cell_text:
-                    continue
-                if ":" in cell_text:
-                    add_candidate(cell_text.split(":", 1)[0])
-    return candidates
-
-
-def detect_fields_with_llm(template_bytes: bytes) -> Dict[str, str]:
+_PLACEHOLDER_RE = re.compile(r"(?=\{\{(.*?)\}\})", re.S)
+# Longest label ending (colon included) indexed for paragraphs; similar labels
+# such as "Date of Loss:" and "Date of Inspection:" rarely share 16 characters.
+_LABEL_TAIL_CHARS = 16
+
+
+@lru_cache(maxsize=1)
+def _compiled_templates() -> JSONCache:
+    return JSONCache("compiled_templates", max_entries=get_settings().compiled_template_cache_size)
+
+
+class CompiledTemplate:
+    """One parse of a template plus an index of every place a value can go.
+
+    Built once per template (see ``compile_template``). Paragraph labels are
+    indexed by the text just before each colon, ``{{placeholders}}`` by
+    name and table cells by exact text and by trigram. Filling then looks each
+    field up instead of scanning every paragraph and cell for every field.
+    Matching always uses the template's original text. The parsed document and
+    the package's other parts are kept too, so a fill only copies and
+    re-serialises the main document XML.
+    """
+
+    def __init__(self, template_bytes: bytes, sha256: str | None = None) -> None:
+        self.template_bytes = template_bytes
+        self.sha256 = sha256 or hashlib.sha256(template_bytes).hexdigest()
+        document = _load_document(template_bytes)
+        self._document = document
+        self._document_part = document.part.partname.lstrip("/")
+        with zipfile.ZipFile(io.BytesIO(template_bytes)) as package:
+            self._package_entries = [(info, package.read(info)) for info in package.infolist()]
+
+        text_parts: List[str] = []
+        candidates: Set[str] = set()
+
+        def add_candidate(text: str) -> None:
+            cleaned = text.strip().strip(":")
+            if 1 < len(cleaned) <= 80:
+                candidates.add(cleaned)
+
+        self._paragraphs: List[str] = []
+        self._label_tails: Dict[str, List[int]] = defaultdict(list)
+        self._colon_paragraphs: List[int] = []
+        self._placeholders: Dict[str, List[int]] = defaultdict(list)
+        for position, paragraph in enumerate(document.paragraphs):
+            original_text = paragraph.text
+            self._paragraphs.append(original_text)
+            text = original_text.strip()
+            if not text:
+                continue
+            text_parts.append(original_text)
+            if "{{" in text and "}}" in text:
+                for chunk in text.split("{{"):
+                    if "}}" in chunk:
+                        add_candidate(chunk.split("}}", 1)[0])
+            elif ":" in text:
+                add_candidate(text.split(":", 1)[0])
+
+            if ":" in original_text:
+                self._colon_paragraphs.append(position)
+                tails = {
+                    original_text[i - length + 1:i + 1]
+                    for i, char in enumerate(original_text)
+                    if char == ":"
+                    for length in range(3, min(_LABEL_TAIL_CHARS, i + 1) + 1)
+                }
+                for tail in tails:
+                    self._label_tails[tail].append(position)
+            for name in dict.fromkeys(_PLACEHOLDER_RE.findall(original_text)):
+                self._placeholders[name].append(position)
+
+        # Cells are addressed by (table, row, column) as enumerated by ``row.cells``.
+        self._cells: List[tuple[int, int, int, str, int]] = []
+        self._cell_text: Dict[str, List[int]] = defaultdict(list)
+        self._cell_trigrams: Dict[str, List[int]] = defaultdict(list)
+        self._colon_cells: List[int] = []
+        for table_index, table in enumerate(document.tables):
+            for row_index, row in enumerate(table.rows):
+                cells = row.cells
+                row_parts: List[str] = []
+                for column, cell in enumerate(cells):
+                    cell_text = cell.text.strip()
+                    if not cell_text:
+                        continue
+                    row_parts.append(cell_text)
+                    cell_id = len(self._cells)
+                    self._cells.append((table_index, row_index, column, cell_text, len(cells)))
+                    self._cell_text[cell_text].append(cell_id)
+                    if ":" in cell_text:
+                        add_candidate(cell_text.split(":", 1)[0])
+                        self._colon_cells.append(cell_id)
+                        for trigram in {cell_text[i:i + 3] for i in range(len(cell_text) - 2)}:
+                            self._cell_trigrams[trigram].append(cell_id)
+                if row_parts:
+                    text_parts.append(" | ".join(row_parts))
+
+        self.text = "\n".join(text_parts)
+        self.candidates = frozenset(candidates)
+
+    def _label_paragraphs(self, key: str) -> List[int]:
+        matches: List[int] = []
+        for needle in (f"{key}:", f"{key} :"):
+            if len(needle) < 3:
+                positions: Iterable[int] = self._colon_paragraphs
+            else:
+                positions = self._label_tails.get(needle[-_LABEL_TAIL_CHARS:], ())
+            matches.extend(position for position in positions if needle in self._paragraphs[position])
+        return matches
+
+    def _placeholder_paragraphs(self, key: str) -> List[int]:
+        needle = f"{{{{{key}}}}}"
+        return [position for position in self._placeholders.get(key, ()) if needle in self._paragraphs[position]]
+
+    def _label_cells(self, key: str) -> List[int]:
+        if len(key) < 3:
+            cell_ids: Iterable[int] = self._colon_cells
+        else:
+            postings = [self._cell_trigrams.get(key[i:i + 3], ()) for i in range(len(key) - 2)]
+            cell_ids = min(postings, key=len)
+        return [cell_id for cell_id in cell_ids if key in self._cells[cell_id][3]]
+
+    def fill(self, data: Dict[str, str]) -> bytes:
+        """Write ``data`` into a fresh copy of the template and return the DOCX bytes.
+
+        Every paragraph or cell takes the first field, in ``data`` order, that
+        matches it: ``Field:`` labels are replaced by ``Field:\\nvalue``,
+        ``{{Field}}`` placeholders by the value, and a cell whose whole text is
+        the field name passes the value to the cell on its right.
+        """
+        paragraph_plan: Dict[int, tuple[str, str, bool]] = {}
+        cell_plan: Dict[int, tuple[str, str, bool]] = {}
+        for key, value in data.items():
+            if not value:
+                continue
+            for position in self._label_paragraphs(key):
+                paragraph_plan.setdefault(position, (key, value, True))
+            for position in self._placeholder_paragraphs(key):
+                paragraph_plan.setdefault(position, (key, value, False))
+            for cell_id in self._label_cells(key):
+                cell_plan.setdefault(cell_id, (key, value, True))
+            for cell_id in self._cell_text.get(key, ()):
+                _, _, column, _, width = self._cells[cell_id]
+                if column + 1 < width:
+                    cell_plan.setdefault(cell_id, (key, value, False))
+
+        from docx.document import Document
+        from docx.opc.oxml import serialize_part_xml
+
+        element = copy.deepcopy(self._document.element)
+        document = Document(element, self._document.part)
+        if paragraph_plan:
+            paragraphs = document.paragraphs
+            for position, (key, value, is_label) in paragraph_plan.items():
+                paragraph = paragraphs[position]
+                if is_label:
+                    # Replace the entire paragraph with "Field Name:\nValue"
+                    paragraph.clear()
+                    paragraph.add_run(f"{key}:\n{value}")
+                else:
+                    paragraph.text = self._paragraphs[position].replace(f"{{{{{key}}}}}", value)
+
+        if cell_plan:
+            tables = document.tables
+            table_rows: Dict[int, list] = {}
+            rows: Dict[tuple[int, int], tuple] = {}
+            received: Set[tuple[int, int, int]] = set()
+            for cell_id in sorted(cell_plan):
+                table_index, row_index, column, _, _ = self._cells[cell_id]
+                if (table_index, row_index, column) in received:
+                    continue  # already holds the value of the label to its left
+                key, value, is_label = cell_plan[cell_id]
+                if table_index not in table_rows:
+                    table_rows[table_index] = list(tables[table_index].rows)
+                if (table_index, row_index) not in rows:
+                    rows[table_index, row_index] = table_rows[table_index][row_index].cells
+                cells = rows[table_index, row_index]
+                if is_label:
+                    cells[column].text = f"{key}:\n{value}"
+                else:
+                    cells[column + 1].text = value
+                    received.add((table_index, row_index, column + 1))
+
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as package:
+            for info, blob in self._package_entries:
+                if info.filename == self._document_part:
+                    blob = serialize_part_xml(element)
+                package.writestr(info, blob)
+        return buffer.getvalue()
+
+
+def compile_template(template_bytes: bytes) -> CompiledTemplate:
+    """Return the compiled form of ``template_bytes``, parsing it only on a cache miss."""
+    sha256 = hashlib.sha256(template_bytes).hexdigest()
+    compiled = _compiled_templates().get(sha256)
+    record_cache("compiled_template", compiled is not None)
+    if compiled is None:
+        compiled = CompiledTemplate(template_bytes, sha256)
+        _compiled_templates().set(sha256, compiled)
+    return compiled
+
+
+def _compiled(template: CompiledTemplate | bytes) -> CompiledTemplate:
+    return template if isinstance(template, CompiledTemplate) else compile_template(template)
+
+
+def extract_template_text(template: CompiledTemplate | bytes) -> str:
+    return _compiled(template).text
+
+
+def _heuristic_field_candidates(template: CompiledTemplate | bytes) -> Set[str]:
+    return set(_compiled(template).candidates)
+
+
+async def detect_fields_with_llm(template: CompiledTemplate | bytes) -> Tuple[Dict[str, str], bool]:
+    """Ask the LLM for the template's field names; also returns whether the answer needed repair."""
     settings = get_settings()
-    template_text = extract_template_text(template_bytes)
-    candidates = sorted(_heuristic_field_candidates(template_bytes))
+    compiled = await asyncio.to_thread(_compiled, template)
+    template_text = compiled.text
+    candidates = sorted(compiled.candidates)
 
     prompt = f"""Extract field names from this insurance template. Return a JSON object where keys are field names and values are empty strings.
 
@@ -72,75 +264,25 @@ CANDIDATE FIELDS:
 
 Return ONLY JSON, no markdown or commentary."""
 
-    response = create_chat_completion(
+    response = await create_chat_completion(
         messages=[
             {"role": "system", "content": "You extract field names from templates and return JSON."},
             {"role": "user", "content": prompt},
-        ]
+        ],
+        response_schema=object_schema(),
     )
 
-    try:
-        cleaned = response.strip()
-        if cleaned.startswith("```json"):
-            cleaned = cleaned.split("```json", 1)[1].split("```", 1)[0].strip()
-        elif cleaned.startswith("```"):
-            cleaned = cleaned.split("```", 1)[1].split("```", 1)[0].strip()
-        return json.loads(cleaned)
-    except json.JSONDecodeError as exc:
-        print(f"[template_logic] Failed to parse LLM response as JSON: {response[:500]}")
-        fallback = {label: "" for label in candidates}
-        if fallback:
-            return fallback
-        raise ValueError("Failed to parse template fields JSON") from exc
-
-
-def fill_template(template_bytes: bytes, data: Dict[str, str]) -> bytes:
-    document = _load_document(template_bytes)
-
-    # Fill paragraphs - look for "Field Name:" patterns and insert value after
-    for paragraph in document.paragraphs:
-        original_text = paragraph.text
-        if not original_text.strip():
-            continue
-            
-        for key, value in data.items():
-            if not value:
-                continue
-                
-            # Check if this paragraph contains the field name followed by a colon
-            if f"{key}:" in original_text or f"{key} :" in original_text:
-                # Replace the entire paragraph with "Field Name:\nValue"
-                paragraph.clear()
-                paragraph.add_run(f"{key}:\n{value}")
-                break
-            elif f"{{{{{key}}}}}" in original_text:
-                # Handle {{placeholder}} style
-                paragraph.text = original_text.replace(f"{{{{{key}}}}}", value)
-                break
-
-    # Fill tables
-    for table in document.tables:
-        for row in table.rows:
-            for idx, cell in enumerate(row.cells):
-                cell_text = cell.text.strip()
-                if not cell_text:
-                    continue
-                    
-                for key, value in data.items():
-                    if not value:
-                        continue
-                        
-                    # Check if this cell contains the field name
-                    if key in cell_text and ":" in cell_text:
-                        # Field name with colon in same cell - replace after colon
-                        cell.text = f"{key}:\n{value}"
-                        break
-                    elif key == cell_text and idx + 1 < len(row.cells):
-                        # Field name alone in cell, value goes in next cell
-                        row.cells[idx + 1].text = value
-                        break
-
-    buffer = io.BytesIO()
-    document.save(buffer)
-    buffer.seek(0)
-    return buffer.getvalue()
+    fields, repaired = parse_json_object(response, candidates)
+    if not repaired:
+        return fields, False
+    # Field names are all the answer was for, so a damaged one is completed
+    # from the heuristic candidates instead of being asked for again.
+    print(f"[template_logic] Repaired malformed field detection JSON ({len(fields)} fields recovered): {response[:200]}")
+    fields.update({label: "" for label in candidates if label not in fields})
+    if fields:
+        return fields, True
+    raise ValueError("Failed to parse template fields JSON")
+
+
+def fill_template(template: CompiledTemplate | bytes, data: Dict[str, str]) -> bytes:
+    return _compiled(template).fill(data)
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Tuple
+
+_BOUNDARIES = ("\n--- End of Report", "\n\n", "\n", ". ", " ")
+# Values this short and on one line are scalars (dates, numbers, names), not prose.
+_SCALAR_MAX_CHARS = 80
+
+
+@dataclass
+class TextChunk:
+    index: int
+    start: int
+    end: int
+    text: str
+
+
+def _cut_point(text: str, start: int, limit: int) -> int:
+    """Best place to end a chunk that may not extend past ``limit``.
+
+    Looks for the strongest boundary in the last fifth of the window so chunks
+    end on report, paragraph or line breaks rather than mid-sentence.
+    """
+    if limit >= len(text):
+        return len(text)
+    floor = start + (limit - start) * 4 // 5
+    for boundary in _BOUNDARIES:
+        position = text.rfind(boundary, floor, limit)
+        if position != -1:
+            return position + (0 if boundary.startswith("\n---") else len(boundary))
+    return limit
+
+
+def split_text(text: str, chunk_chars: int, overlap_chars: int = 0) -> List[TextChunk]:
+    """Split ``text`` into chunks of at most ``chunk_chars`` with ~``overlap_chars`` of overlap."""
+    if chunk_chars <= 0:
+        raise ValueError("chunk_chars must be positive")
+    overlap_chars = max(0, min(overlap_chars, chunk_chars // 2))
+
+    chunks: List[TextChunk] = []
+    start = 0
+    while start < len(text):
+        end = _cut_point(text, start, start + chunk_chars)
+        chunks.append(TextChunk(len(chunks), start, end, text[start:end]))
+        if end >= len(text):
+            break
+        next_start = max(end - overlap_chars, start + 1)
+        if overlap_chars:
+            # Begin the overlap on a line start so the repeated context is readable.
+            line_start = text.find("\n", next_start, end)
+            if line_start != -1:
+                next_start = line_start + 1
+        start = next_start
+    return chunks
+
+
+def _normalise(value: str) -> str:
+    return re.sub(r"\s+", " ", value).strip().casefold()
+
+
+def _as_text(value: Any) -> str:
+    if value is None:
+        return ""
+    return value.strip() if isinstance(value, str) else str(value).strip()
+
+
+def merge_partial_values(
+    fields: Iterable[str], partials: List[Dict[str, Any]]
+) -> Tuple[Dict[str, str], Dict[str, List[int]]]:
+    """Deterministically merge per-chunk extraction results.
+
+    For every field the non-empty values are taken in chunk order; values that are
+    repeated or contained in a longer value from another chunk (typical for text in
+    the overlap) are dropped. If every value left is a short single line, the field
+    is a scalar written two ways ("03/14/2024" and "March 14, 2024"), and the first
+    one wins; otherwise the field is free text and the values are joined with
+    newlines. Returns the merged values and, per field, the chunk indices the kept
+    values came from.
+    """
+    ordered_fields = list(fields)
+    seen = set(ordered_fields)
+    for partial in partials:
+        for key in partial:
+            if key not in seen:
+                seen.add(key)
+                ordered_fields.append(key)
+
+    merged: Dict[str, str] = {}
+    provenance: Dict[str, List[int]] = {}
+    for field in ordered_fields:
+        candidates = [
+            (index, text, _normalise(text))
+            for index, partial in enumerate(partials)
+            if (text := _as_text(partial.get(field)))
+        ]
+        kept: List[Tuple[int, str]] = []
+        for position, (index, text, norm) in enumerate(candidates):
+            redundant = False
+            for other_position, (_, _, other_norm) in enumerate(candidates):
+                if other_position == position:
+                    continue
+                if norm == other_norm and other_position < position:
+                    redundant = True
+                elif norm != other_norm and norm in other_norm:
+                    redundant = True
+                if redundant:
+                    break
+            if not redundant:
+                kept.append((index, text))
+        if len(kept) > 1 and all(len(text) <= _SCALAR_MAX_CHARS and "\n" not in text for _, text in kept):
+            kept = kept[:1]
+        merged[field] = "\n".join(text for _, text in kept)
+        provenance[field] = [index for index, _ in kept]
+    return merged, provenance
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from backend.config import get_settings
+from backend.services.llm_providers import get_provider
+from backend.services.llm_scheduler import get_scheduler
+from backend.services.pipeline import get_pipeline
+
+WARMING_UP = "warming_up"
+READY = "ready"
+FAILED = "failed"
+
+
+def _import_libraries() -> None:
+    """Import the heavy dependencies that ``backend`` only loads on first use."""
+    import docx  # noqa: F401
+    import fitz  # noqa: F401  # type: ignore
+
+    if get_settings().llm_provider == "gemini":
+        import google.generativeai  # noqa: F401
+
+
+class WarmUp:
+    """Prepares everything the first request would otherwise pay for.
+
+    Runs in the background after start-up so the app answers liveness checks
+    at once; ``status`` becomes ``ready`` when every step has finished, or
+    ``failed`` (with ``error``) if one raised. Requests arriving earlier still
+    work, they just build what they need themselves. The singletons are built
+    on the event loop so such a request cannot race the warm-up into creating
+    a second one; only imports, which Python serialises, run in a thread.
+    """
+
+    def __init__(self) -> None:
+        self.status = WARMING_UP
+        self.error: Optional[str] = None
+        self.seconds: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    @contextmanager
+    def _step(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        yield
+        self.seconds[name] = round(time.perf_counter() - started, 4)
+
+    async def _run(self) -> None:
+        try:
+            with self._step("libraries"):
+                await asyncio.to_thread(_import_libraries)
+            with self._step("pipeline"):
+                pipeline = get_pipeline()
+            with self._step("pdf_converter"):
+                await pipeline.converter.start()
+            with self._step("artifact_gc"):
+                await pipeline.artifacts.start()
+            # Last, so a misconfigured provider does not keep the converter from starting.
+            with self._step("llm_client"):
+                get_provider()
+                get_scheduler()
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:  # noqa: BLE001 - reported through readiness instead of crashing start-up
+            self.status = FAILED
+            self.error = f"{type(exc).__name__}: {exc}"
+            print(f"[warmup] Warm-up failed: {self.error}")
+            return
+        self.status = READY
+        print(f"[warmup] Ready in {sum(self.seconds.values()):.2f}s {self.seconds}")
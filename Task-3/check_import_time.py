@@ -0,0 +1,96 @@
+"""Import-time budget check for the GLR backend.
+
+Imports ``backend.main`` in fresh interpreters and fails (exit status 1) when
+the backend's own import time exceeds the budget or when a dependency that
+must load lazily (the Gemini client, PyMuPDF, python-docx) is imported at start-up.
+The web framework is imported and timed first and reported separately, so the
+budget covers only the backend's code and stays comparable across machines.
+Run it in CI or before merging changes that add imports:
+
+    python check_import_time.py
+    python check_import_time.py --budget 0.3 --runs 7 --output import_time.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+# Loaded on first use (or during warm-up), never when backend.main is imported.
+LAZY_MODULES = ["google.generativeai", "fitz", "pymupdf", "docx"]
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import fastapi, pydantic_settings, starlette.responses
+framework = time.perf_counter() - started
+started = time.perf_counter()
+import backend.main
+backend = time.perf_counter() - started
+print(json.dumps({
+    "framework_seconds": framework,
+    "backend_seconds": backend,
+    "lazy_modules_loaded": sorted(name for name in json.loads(sys.argv[1]) if name in sys.modules),
+}))
+"""
+
+
+def measure_once() -> Dict[str, Any]:
+    completed = subprocess.run(
+        [sys.executable, "-c", _PROBE, json.dumps(LAZY_MODULES)],
+        cwd=Path(__file__).resolve().parent,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def check_import_time(budget: float, runs: int) -> Dict[str, Any]:
+    samples: List[Dict[str, Any]] = [measure_once() for _ in range(runs)]
+    backend = sorted(sample["backend_seconds"] for sample in samples)
+    framework = sorted(sample["framework_seconds"] for sample in samples)
+    loaded = sorted({name for sample in samples for name in sample["lazy_modules_loaded"]})
+    # The fastest run is the least disturbed by other load on the machine.
+    return {
+        "budget_seconds": budget,
+        "runs": runs,
+        "backend_seconds": {"min": round(backend[0], 4), "median": round(statistics.median(backend), 4)},
+        "framework_seconds": {"min": round(framework[0], 4), "median": round(statistics.median(framework), 4)},
+        "lazy_modules_loaded": loaded,
+        "passed": backend[0] <= budget and not loaded,
+    }
+
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Fail when importing backend.main gets slower than the budget.")
+    parser.add_argument("--budget", type=float, default=0.2, help="Seconds allowed for the backend's own imports.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to measure; the fastest counts.")
+    parser.add_argument("--output", type=Path, help="Also write the JSON report here.")
+    args = parser.parse_args(argv)
+    if args.runs < 1 or args.budget <= 0:
+        parser.error("--runs and --budget must be positive")
+    return args
+
+
+def main(argv: List[str] | None = None) -> None:
+    args = parse_args(argv)
+    report = check_import_time(args.budget, args.runs)
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(payload, encoding="utf-8")
+    print(payload)
+    if report["lazy_modules_loaded"]:
+        print(f"Imported at start-up but must load lazily: {', '.join(report['lazy_modules_loaded'])}", file=sys.stderr)
+    if report["backend_seconds"]["min"] > args.budget:
+        print(f"backend.main took {report['backend_seconds']['min']}s to import (budget {args.budget}s)", file=sys.stderr)
+    sys.exit(0 if report["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""Offline end-to-end load test for the GLR pipeline.
+
+Generates synthetic templates and photo-report PDFs, drives ``POST /api/glr``
+at a fixed concurrency and reports throughput, latency percentiles, error rates
+and the server's mean stage timings as JSON. By default the app runs in-process
+with the local stand-in LLM provider and a temporary output directory, so no
+network, API key or LibreOffice is needed.
+
+    python loadtest.py --requests 200 --concurrency 16
+    python loadtest.py --llm-latency 2 --llm-failure-rate 0.05 --output load.json
+    python loadtest.py --llm-malformed-rate 0.2 --templates 1
+    python loadtest.py --url http://localhost:8000 --requests 50 --concurrency 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import docx
+import fitz  # type: ignore
+import httpx
+
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+LABELS = [
+    "Insured Name", "Claim Number", "Policy Number", "Date of Loss", "Date of Inspection",
+    "Loss Address", "Cause of Loss", "Roof Description", "Dwelling Description", "Interior Damage",
+    "Adjuster Name", "Mortgagee", "Deductible", "Coverage A", "Priors", "Subrogation", "Salvage",
+    "Recommendations", "Contents", "Additional Living Expense",
+]
+FILLER = (
+    "Photo shows the north elevation of the dwelling. Shingles are lifted along the ridge line and "
+    "granule loss is visible on the downslope. Gutters and downspouts are intact. "
+)
+
+
+def _labels(count: int) -> List[str]:
+    return [LABELS[i] if i < len(LABELS) else f"Additional Field {i + 1}" for i in range(count)]
+
+
+def make_template(fields: int, variant: int) -> bytes:
+    """Template with ``Label:`` paragraphs, a label/value table and one placeholder line."""
+    labels = _labels(fields)
+    document = docx.Document()
+    document.add_heading(f"General Loss Report (variant {variant})", level=1)
+    paragraph_labels = labels[: len(labels) * 2 // 3]
+    table_labels = labels[len(paragraph_labels):]
+    for label in paragraph_labels:
+        document.add_paragraph(f"{label}:")
+    table = document.add_table(rows=max(1, len(table_labels)), cols=2)
+    for row, label in zip(table.rows, table_labels):
+        row.cells[0].text = label
+    document.add_paragraph("Prepared for {{" + labels[0] + "}}")
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def make_report(fields: int, pages: int, claim: int) -> bytes:
+    """Photo-report PDF whose first page states every field as ``Label: value``."""
+    rng = random.Random(claim)
+    lines = [f"{label}: {label.lower()} for claim {claim} #{rng.randint(1000, 9999)}" for label in _labels(fields)]
+    document = fitz.open()
+    for page_number in range(pages):
+        page = document.new_page()
+        body = lines if page_number == 0 else [FILLER * 3, f"Photo {page_number} of claim {claim}"]
+        page.insert_textbox(fitz.Rect(40, 40, 560, 800), "\n".join(body), fontsize=9)
+    payload = document.tobytes()
+    document.close()
+    return payload
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _stage_means(metrics_text: str) -> Dict[str, float]:
+    sums: Dict[str, float] = {}
+    counts: Dict[str, float] = {}
+    for match in re.finditer(r'^glr_stage_duration_seconds_(sum|count)\{stage="([^"]+)"\} (\S+)$', metrics_text, re.M):
+        kind, stage, value = match.groups()
+        (sums if kind == "sum" else counts)[stage] = float(value)
+    return {stage: round(sums[stage] / counts[stage], 4) for stage in sums if counts.get(stage)}
+
+
+def _counter(metrics_text: str, name: str) -> Dict[str, float]:
+    return {
+        labels or "total": float(value)
+        for labels, value in re.findall(rf"^{name}(?:\{{([^}}]*)\}})? (\S+)$", metrics_text, re.M)
+    }
+
+
+async def _wait_until_ready(client: httpx.AsyncClient, timeout: float) -> Dict[str, Any]:
+    """Poll readiness so warm-up is not counted against the first requests."""
+    deadline = time.perf_counter() + timeout
+    while True:
+        response = await client.get("/health/ready")
+        if response.status_code == 404:
+            return {}  # server predates readiness checks
+        payload = response.json()
+        if response.status_code == 200 or payload.get("status") == "failed" or time.perf_counter() > deadline:
+            return payload
+        await asyncio.sleep(0.1)
+
+
+async def _drive(client: httpx.AsyncClient, args: argparse.Namespace) -> Dict[str, Any]:
+    readiness = await _wait_until_ready(client, args.timeout)
+    if readiness.get("status") == "failed":
+        raise SystemExit(f"Server failed to warm up: {readiness.get('error')}")
+    templates = [make_template(args.fields, variant) for variant in range(args.templates)]
+    shared_report = make_report(args.fields, args.pages, 0) if args.repeat_reports else None
+
+    async def one_request(index: int) -> tuple[float, str]:
+        template = templates[index % len(templates)]
+        report = shared_report or await asyncio.to_thread(make_report, args.fields, args.pages, index + 1)
+        files = [("template", ("template.docx", template, DOCX_TYPE)), ("reports", ("report.pdf", report, "application/pdf"))]
+        started = time.perf_counter()
+        try:
+            response = await client.post("/api/glr", files=files, timeout=args.timeout)
+            outcome = str(response.status_code)
+        except httpx.HTTPError as exc:
+            outcome = type(exc).__name__
+        return time.perf_counter() - started, outcome
+
+    for index in range(args.warmup):
+        await one_request(-1 - index)
+
+    slots = asyncio.Semaphore(args.concurrency)
+
+    async def bounded(index: int) -> tuple[float, str]:
+        async with slots:
+            return await one_request(index)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(bounded(index) for index in range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, outcome in results if outcome == "200")
+    outcomes = Counter(outcome for _, outcome in results)
+    errors = args.requests - outcomes.get("200", 0)
+    metrics_text = (await client.get("/metrics")).text
+    return {
+        "requests": args.requests,
+        "succeeded": outcomes.get("200", 0),
+        "errors": dict(sorted((key, value) for key, value in outcomes.items() if key != "200")),
+        "error_rate": round(errors / args.requests, 4) if args.requests else 0.0,
+        "duration_seconds": round(elapsed, 3),
+        "throughput_rps": round(args.requests / elapsed, 3) if elapsed else 0.0,
+        "latency_seconds": {
+            "mean": round(statistics.fmean(latencies), 4) if latencies else 0.0,
+            "p50": round(_percentile(latencies, 50), 4),
+            "p90": round(_percentile(latencies, 90), 4),
+            "p95": round(_percentile(latencies, 95), 4),
+            "p99": round(_percentile(latencies, 99), 4),
+            "max": round(latencies[-1], 4) if latencies else 0.0,
+        },
+        "server": {
+            "warm_up_seconds": readiness.get("warm_up_seconds", {}),
+            "stage_mean_seconds": _stage_means(metrics_text),
+            "llm_attempts": _counter(metrics_text, "glr_llm_attempts_total"),
+            "llm_retries": _counter(metrics_text, "glr_llm_retries_total").get("total", 0.0),
+            "json_repairs": _counter(metrics_text, "glr_llm_json_repairs_total").get("total", 0.0),
+            "rerequested_fields": _counter(metrics_text, "glr_llm_rerequested_fields_total").get("total", 0.0),
+            "cache_lookups": _counter(metrics_text, "glr_cache_lookups_total"),
+        },
+    }
+
+
+async def _run_in_process(args: argparse.Namespace) -> Dict[str, Any]:
+    from backend.main import app, lifespan
+
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+            return await _drive(client, args)
+
+
+async def _run_remote(args: argparse.Namespace) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits) as client:
+        return await _drive(client, args)
+
+
+def _configure_environment(args: argparse.Namespace, output_dir: Optional[str]) -> None:
+    """Settings are read from the environment when ``backend`` is first imported."""
+    os.environ["LLM_PROVIDER"] = args.provider
+    os.environ["LOCAL_LLM_LATENCY"] = str(args.llm_latency)
+    os.environ["LOCAL_LLM_JITTER"] = str(args.llm_jitter)
+    os.environ["LOCAL_LLM_FAILURE_RATE"] = str(args.llm_failure_rate)
+    os.environ["LOCAL_LLM_MALFORMED_RATE"] = str(args.llm_malformed_rate)
+    os.environ["LOCAL_LLM_SEED"] = str(args.seed)
+    os.environ["LLM_REQUESTS_PER_MINUTE"] = str(args.rpm)
+    os.environ["LLM_TOKENS_PER_MINUTE"] = str(args.tpm)
+    os.environ["MAX_CONCURRENT_RUNS"] = str(args.max_concurrent_runs or args.concurrency)
+    if output_dir:
+        os.environ["GLR_OUTPUT_DIR"] = output_dir
+        # Caches under a temporary output directory start empty and vanish afterwards.
+        os.environ.setdefault("FIELD_CACHE_PERSIST", "false")
+        os.environ.setdefault("EXTRACTION_CACHE_PERSIST", "false")
+
+
+def run_load_test(args: argparse.Namespace) -> Dict[str, Any]:
+    config = {key: (str(value) if isinstance(value, Path) else value) for key, value in vars(args).items()}
+    if args.url:
+        results = asyncio.run(_run_remote(args))
+    else:
+        with tempfile.TemporaryDirectory(prefix="glr_loadtest_") as output_dir:
+            _configure_environment(args, None if args.keep_output else output_dir)
+            sys.path.insert(0, str(Path(__file__).resolve().parent))
+            results = asyncio.run(_run_in_process(args))
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "platform": {"python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count()},
+        "config": config,
+        "results": results,
+    }
+
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Drive /api/glr with synthetic claims and report latency and errors.")
+    parser.add_argument("--url", help="Target a running server instead of an in-process app (its settings apply).")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed requests sent first.")
+    parser.add_argument("--fields", type=int, default=12, help="Fields per synthetic template.")
+    parser.add_argument("--templates", type=int, default=2, help="Distinct templates rotated across requests.")
+    parser.add_argument("--pages", type=int, default=3, help="Pages per synthetic report.")
+    parser.add_argument("--repeat-reports", action="store_true", help="Send one identical report so extraction hits the cache.")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--provider", choices=["local", "gemini"], default="local")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Local provider seconds per call.")
+    parser.add_argument("--llm-jitter", type=float, default=0.2)
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0)
+    parser.add_argument("--llm-malformed-rate", type=float, default=0.0, help="Share of local answers cut short.")
+    parser.add_argument("--rpm", type=int, default=0, help="LLM requests/minute budget (0 = unlimited).")
+    parser.add_argument("--tpm", type=int, default=0, help="LLM tokens/minute budget (0 = unlimited).")
+    parser.add_argument("--max-concurrent-runs", type=int, default=0, help="Server run slots (default: --concurrency).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep-output", action="store_true", help="Write outputs to task_3_output instead of a temp dir.")
+    parser.add_argument("--output", type=Path, help="Write JSON results here instead of stdout.")
+    args = parser.parse_args(argv)
+    if args.requests < 1 or args.concurrency < 1 or args.templates < 1 or args.fields < 1 or args.pages < 1:
+        parser.error("--requests, --concurrency, --templates, --fields and --pages must be positive")
+    return args
+
+
+def main(argv: List[str] | None = None) -> None:
+    args = parse_args(argv)
+    results = run_load_test(args)
+    payload = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(payload, encoding="utf-8")
+        print(f"Wrote {args.output}")
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,7 @@ const valuesPre = document.getElementById('values');
 const excerptPre = document.getElementById('excerpt');
 const diagnosticsLink = document.getElementById('diagnostics-link');
 const submitBtn = document.getElementById('submit-btn');
+const liveValuesPre = document.getElementById('live-values');
 
 // Preview elements
 const docxDownloadBtn = document.getElementById('docx-download-btn');
@@ -206,6 +207,164 @@ async function renderPDF(pdfUrl, containerId) {
   }
 }
 
+const STAGE_MESSAGES = {
+  queued: 'Queued. Waiting for a free pipeline worker...',
+  extracting: 'Extracting text from the photo reports...',
+  detecting_fields: 'Detecting template fields...',
+  detecting_and_extracting: 'Detecting template fields and extracting their values...',
+  extracting_values: 'Extracting field values with the LLM...',
+  filling: 'Filling the template...',
+  converting: 'Converting the filled template to PDF...',
+};
+
+// Shows field values as the LLM produces them, before the document is filled.
+function renderStreamedFields(values) {
+  if (!liveValuesPre) {
+    return;
+  }
+  const count = Object.keys(values).length;
+  statusEl.textContent = `Extracted ${count} field${count === 1 ? '' : 's'} so far...`;
+  liveValuesPre.textContent = pretty(values);
+  liveValuesPre.hidden = false;
+}
+
+function renderResult(payload) {
+  // Verify all required elements exist
+  if (!fieldsPre || !valuesPre || !excerptPre) {
+    console.error('Missing result display elements');
+    throw new Error('UI elements not found');
+  }
+
+  fieldsPre.textContent = pretty(payload.extracted_fields);
+  valuesPre.textContent = pretty(payload.filled_values);
+  excerptPre.textContent = payload.report_excerpt;
+  
+  // Setup download links
+  const docxFilename = `filled_template_${payload.run_id}.docx`;
+  const pdfFilename = `filled_template_${payload.run_id}.pdf`;
+  
+  if (docxDownloadBtn) {
+    docxDownloadBtn.href = payload.download_url;
+    docxDownloadBtn.setAttribute('download', docxFilename);
+  }
+  
+  const docxFilenameSpan = document.getElementById('docx-filename');
+  if (docxFilenameSpan) {
+    docxFilenameSpan.textContent = docxFilename;
+  }
+  
+  if (payload.pdf_url && payload.pdf_status === 'ready' && pdfDownloadBtn) {
+    pdfDownloadBtn.href = payload.pdf_url;
+    pdfDownloadBtn.setAttribute('download', pdfFilename);
+    pdfDownloadBtn.style.display = 'inline-block';
+    
+    // Render PDF preview
+    setTimeout(() => {
+      renderPDF(payload.pdf_url, 'pdf-viewer-container');
+    }, 100);
+    
+    // Make sure PDF tab is active
+    const pdfPreview = document.getElementById('pdf-preview');
+    const docxPreview = document.getElementById('docx-preview');
+    
+    document.querySelectorAll('.tab-btn').forEach(btn => {
+      if (btn.dataset.tab === 'pdf') {
+        btn.classList.add('active');
+      } else {
+        btn.classList.remove('active');
+      }
+    });
+    
+    if (pdfPreview) {
+      pdfPreview.classList.add('active');
+      pdfPreview.style.display = 'block';
+    }
+    if (docxPreview) {
+      docxPreview.classList.remove('active');
+      docxPreview.style.display = 'none';
+    }
+  } else {
+    if (pdfDownloadBtn) {
+      pdfDownloadBtn.style.display = 'none';
+    }
+    // Show DOCX tab if no PDF
+    const pdfPreview = document.getElementById('pdf-preview');
+    const docxPreview = document.getElementById('docx-preview');
+    
+    document.querySelectorAll('.tab-btn').forEach(btn => {
+      if (btn.dataset.tab === 'docx') {
+        btn.classList.add('active');
+      } else {
+        btn.classList.remove('active');
+      }
+    });
+    
+    if (pdfPreview) {
+      pdfPreview.classList.remove('active');
+      pdfPreview.style.display = 'none';
+    }
+    if (docxPreview) {
+      docxPreview.classList.add('active');
+      docxPreview.style.display = 'block';
+    }
+  }
+  
+  if (diagnosticsLink) {
+    diagnosticsLink.href = payload.diagnostics_url;
+  }
+
+  resultsSection.hidden = false;
+  if (liveValuesPre) {
+    liveValuesPre.hidden = true;
+  }
+  statusEl.textContent = payload.pdf_status === 'pending'
+    ? 'Document ready. Converting to PDF...'
+    : 'Success! Review the extracted values below.';
+}
+
+// Streams job progress over server-sent events; resolves with the final result
+// (PDF included), calls onFields with the values extracted so far as each field
+// arrives and onDocument as soon as the DOCX is ready.
+function followJob(job, onDocument, onFields) {
+  return new Promise((resolve, reject) => {
+    const events = new EventSource(job.events_url);
+    const fieldValues = {};
+
+    events.addEventListener('progress', (event) => {
+      const data = JSON.parse(event.data);
+      statusEl.textContent = STAGE_MESSAGES[data.stage] || `Working (${data.stage})...`;
+    });
+
+    events.addEventListener('field', (event) => {
+      const data = JSON.parse(event.data);
+      fieldValues[data.field] = data.value;
+      onFields(fieldValues);
+    });
+
+    events.addEventListener('document', (event) => {
+      onDocument(JSON.parse(event.data));
+    });
+
+    events.addEventListener('completed', (event) => {
+      events.close();
+      resolve(JSON.parse(event.data));
+    });
+
+    events.addEventListener('failed', (event) => {
+      events.close();
+      reject(new Error(JSON.parse(event.data).detail || 'Pipeline failed'));
+    });
+
+    // EventSource reconnects on its own (resuming via Last-Event-ID); only give up
+    // once the browser has closed the stream for good.
+    events.onerror = () => {
+      if (events.readyState === EventSource.CLOSED) {
+        reject(new Error('Lost connection to the job progress stream.'));
+      }
+    };
+  });
+}
+
 form.addEventListener('submit', async (event) => {
   event.preventDefault();
 
@@ -226,108 +385,28 @@ form.addEventListener('submit', async (event) => {
   formData.append('template', templateFile);
   reportFiles.forEach((file) => formData.append('reports', file));
 
-  statusEl.textContent = 'Running pipeline. This can take ~30s depending on the LLM.';
+  statusEl.textContent = 'Uploading files...';
   submitBtn.disabled = true;
   resultsSection.hidden = true;
+  if (liveValuesPre) {
+    liveValuesPre.hidden = true;
+  }
 
   try {
-    const response = await fetch('/api/glr', {
+    const response = await fetch('/api/jobs', {
       method: 'POST',
       body: formData,
     });
 
-    const payload = await response.json();
+    const job = await response.json();
 
     if (!response.ok) {
-      throw new Error(payload.detail || 'Pipeline failed');
-    }
-
-    // Verify all required elements exist
-    if (!fieldsPre || !valuesPre || !excerptPre) {
-      console.error('Missing result display elements');
-      throw new Error('UI elements not found');
-    }
-
-    fieldsPre.textContent = pretty(payload.extracted_fields);
-    valuesPre.textContent = pretty(payload.filled_values);
-    excerptPre.textContent = payload.report_excerpt;
-    
-    // Setup download links
-    const docxFilename = `filled_template_${payload.run_id}.docx`;
-    const pdfFilename = `filled_template_${payload.run_id}.pdf`;
-    
-    if (docxDownloadBtn) {
-      docxDownloadBtn.href = payload.download_url;
-      docxDownloadBtn.setAttribute('download', docxFilename);
-    }
-    
-    const docxFilenameSpan = document.getElementById('docx-filename');
-    if (docxFilenameSpan) {
-      docxFilenameSpan.textContent = docxFilename;
-    }
-    
-    if (payload.pdf_url && pdfDownloadBtn) {
-      pdfDownloadBtn.href = payload.pdf_url;
-      pdfDownloadBtn.setAttribute('download', pdfFilename);
-      pdfDownloadBtn.style.display = 'inline-block';
-      
-      // Render PDF preview
-      setTimeout(() => {
-        renderPDF(payload.pdf_url, 'pdf-viewer-container');
-      }, 100);
-      
-      // Make sure PDF tab is active
-      const pdfPreview = document.getElementById('pdf-preview');
-      const docxPreview = document.getElementById('docx-preview');
-      
-      document.querySelectorAll('.tab-btn').forEach(btn => {
-        if (btn.dataset.tab === 'pdf') {
-          btn.classList.add('active');
-        } else {
-          btn.classList.remove('active');
-        }
-      });
-      
-      if (pdfPreview) {
-        pdfPreview.classList.add('active');
-        pdfPreview.style.display = 'block';
-      }
-      if (docxPreview) {
-        docxPreview.classList.remove('active');
-        docxPreview.style.display = 'none';
-      }
-    } else {
-      if (pdfDownloadBtn) {
-        pdfDownloadBtn.style.display = 'none';
-      }
-      // Show DOCX tab if no PDF
-      const pdfPreview = document.getElementById('pdf-preview');
-      const docxPreview = document.getElementById('docx-preview');
-      
-      document.querySelectorAll('.tab-btn').forEach(btn => {
-        if (btn.dataset.tab === 'docx') {
-          btn.classList.add('active');
-        } else {
-          btn.classList.remove('active');
-        }
-      });
-      
-      if (pdfPreview) {
-        pdfPreview.classList.remove('active');
-        pdfPreview.style.display = 'none';
-      }
-      if (docxPreview) {
-        docxPreview.classList.add('active');
-        docxPreview.style.display = 'block';
-      }
-    }
-    
-    if (diagnosticsLink) {
-      diagnosticsLink.href = payload.diagnostics_url;
+      throw new Error(job.detail || 'Pipeline failed');
     }
 
-    resultsSection.hidden = false;
-    statusEl.textContent = 'Success! Review the extracted values below.';
+    statusEl.textContent = STAGE_MESSAGES.queued;
+    const payload = await followJob(job, renderResult, renderStreamedFields);
+    renderResult(payload);
   } catch (error) {
     console.error(error);
     statusEl.textContent = error.message;
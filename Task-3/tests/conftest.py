@@ -0,0 +1,6 @@
+import os
+import tempfile
+
+# Keep test runs' artifacts and caches out of task_3_output and away from Gemini.
+os.environ["GLR_OUTPUT_DIR"] = tempfile.mkdtemp(prefix="glr_test_output_")
+os.environ["LLM_PROVIDER"] = "local"
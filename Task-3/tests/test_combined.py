@@ -0,0 +1,56 @@
+import asyncio
+import io
+
+import docx
+
+from backend.models import PipelineSuccessResponse
+from backend.services import llm_client
+from backend.services.llm_providers import ProviderResponse
+from backend.services.pipeline import GLRPipeline
+from backend.services.template_logic import compile_template, fill_template
+
+
+class UntypedAnswerProvider:
+    """Answers the combined call with the non-string values its untyped schema allows."""
+
+    name = "stub"
+    model = "stub-1"
+
+    async def complete(self, messages, schema=None):
+        return ProviderResponse(
+            text='{"Insured Name": "Jane Roe", "Claim Amount": 1250, "Total Loss": false, "Adjuster": null}'
+        )
+
+
+def _template() -> bytes:
+    document = docx.Document()
+    for label in ("Insured Name", "Claim Amount", "Total Loss", "Adjuster"):
+        document.add_paragraph(f"{label}: {{{{{label}}}}}")
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def test_combined_answer_values_become_strings(monkeypatch):
+    monkeypatch.setattr(llm_client, "get_provider", UntypedAnswerProvider)
+    template = compile_template(_template())
+    pipeline = GLRPipeline()
+
+    fields, extraction = asyncio.run(pipeline._detect_and_extract(template, "Claim amount was $1,250."))
+
+    assert extraction.values == {
+        "Insured Name": "Jane Roe",
+        "Claim Amount": "1250",
+        "Total Loss": "false",
+        "Adjuster": "",
+    }
+    assert set(fields) == set(extraction.values)
+    fill_template(template, extraction.values)
+    PipelineSuccessResponse(
+        run_id="run",
+        download_url="/download/run",
+        diagnostics_url="/diagnostics/run",
+        extracted_fields=fields,
+        filled_values=extraction.values,
+        report_excerpt="",
+    )
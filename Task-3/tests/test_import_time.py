@@ -0,0 +1,8 @@
+from check_import_time import check_import_time
+
+
+def test_backend_import_stays_within_budget():
+    report = check_import_time(budget=0.2, runs=3)
+
+    assert not report["lazy_modules_loaded"], f"imported eagerly: {report['lazy_modules_loaded']}"
+    assert report["passed"], f"backend imports took {report['backend_seconds']} s, budget {report['budget_seconds']} s"
@@ -0,0 +1,17 @@
+from backend.services.llm_json import parse_json_object
+
+
+def test_truncated_trailing_number_is_missing():
+    values, repaired = parse_json_object('{"name": "Jane Roe", "amount": 12', ["name", "amount"])
+
+    assert repaired
+    assert values == {"name": "Jane Roe"}
+
+
+def test_number_recovered_after_broken_member():
+    text = '{"name": "Jane \\q Roe", "amount": 1250, "date": "1/2/2024"'
+
+    values, repaired = parse_json_object(text, ["name", "amount", "date"])
+
+    assert repaired
+    assert values == {"amount": 1250, "date": "1/2/2024"}